@@ -1,7 +1,10 @@
 from fastapi import APIRouter
-from .endpoints import auth, users, addresses
+from .endpoints import auth, users, addresses, metrics, zones, shippers
 
 api_router = APIRouter()
 api_router.include_router(auth.router, prefix="/auth", tags=["authentication"])
 api_router.include_router(users.router, prefix="/users", tags=["users"])
-api_router.include_router(addresses.router, prefix="/addresses", tags=["addresses"]) 
\ No newline at end of file
+api_router.include_router(addresses.router, prefix="/addresses", tags=["addresses"])
+api_router.include_router(zones.router, prefix="/zones", tags=["zones"])
+api_router.include_router(shippers.router, prefix="/shippers", tags=["shippers"])
+api_router.include_router(metrics.router, prefix="/metrics", tags=["metrics"])
\ No newline at end of file
@@ -1,29 +1,32 @@
-from typing import Generator, Optional
-from fastapi import Depends, HTTPException, status
+from typing import Optional
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
+from jose import JWTError
 from pydantic import ValidationError
-from sqlalchemy.orm import Session
 
-from ..database.database import get_db
+from ..database.database import DBSession, get_db
+from ..database.replicas import read_session_scope
 from ..models.user import User
 from ..core.config import settings
-from ..schemas.token import TokenPayload
+from ..core.revocation import revocation_list
+from ..core.security import ACCESS_TOKEN_TYPE, decode_access_token
+from ..services.principal_cache import principal_cache
 from ..services.user_service import get_user_by_id
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
+# Cho endpoint nhận token qua query string khi không có header (EventSource không gửi được header)
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login", auto_error=False)
 
-def get_current_user(
-    db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)
+async def get_current_user(
+    primary_db: DBSession = Depends(get_db),
+    token: str = Depends(oauth2_scheme)
 ) -> User:
     """
-    Xác thực và lấy user từ JWT token
+    Xác thực và lấy user từ JWT token.
+    User có thể lấy từ principal cache (bản sao chỉ đọc), cần load lại nếu muốn ghi.
     """
     try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
-        token_data = TokenPayload(**payload)
+        token_data = decode_access_token(token)
     except (JWTError, ValidationError):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -31,15 +34,29 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
         
-    # Kiểm tra token hết hạn
-    if token_data.exp is None:
+    # Kiểm tra token hết hạn, đúng loại access token và chưa bị thu hồi (tra trong bộ nhớ)
+    if (
+        token_data.exp is None
+        or token_data.type not in (None, ACCESS_TOKEN_TYPE)
+        or revocation_list.is_revoked(token_data.jti)
+    ):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token không hợp lệ",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user = get_user_by_id(db, int(token_data.sub))
+    user_id = int(token_data.sub)
+    user = await principal_cache.get(user_id)
+    if user is None:
+        # Chỉ khi cache miss mới cần session đọc (replica nếu có)
+        async with read_session_scope(user_id, primary_db) as db:
+            user = await get_user_by_id(db, user_id)
+            if user is None and db is not primary_db:
+                # User vừa tạo có thể chưa kịp sao chép sang replica
+                user = await get_user_by_id(primary_db, user_id)
+        if user:
+            await principal_cache.set(user)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -47,7 +64,7 @@ def get_current_user(
         )
     return user
 
-def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
+async def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
     """
     Kiểm tra user còn hoạt động hay không
     """
@@ -58,7 +75,26 @@ def get_current_active_user(current_user: User = Depends(get_current_user)) -> U
         )
     return current_user
 
-def get_current_admin_user(current_user: User = Depends(get_current_active_user)) -> User:
+async def get_current_stream_user(
+    access_token: Optional[str] = Query(None),
+    header_token: Optional[str] = Depends(optional_oauth2_scheme),
+    primary_db: DBSession = Depends(get_db)
+) -> User:
+    """
+    Xác thực cho kết nối stream (server-sent events): token lấy từ header Authorization,
+    hoặc từ tham số access_token nếu client không đặt được header
+    """
+    token = header_token or access_token
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    user = await get_current_user(primary_db=primary_db, token=token)
+    return await get_current_active_user(user)
+
+async def get_current_admin_user(current_user: User = Depends(get_current_active_user)) -> User:
     """
     Kiểm tra user có quyền admin hay không
     """
@@ -69,7 +105,7 @@ def get_current_admin_user(current_user: User = Depends(get_current_active_user)
         )
     return current_user
 
-def get_current_restaurant_user(current_user: User = Depends(get_current_active_user)) -> User:
+async def get_current_restaurant_user(current_user: User = Depends(get_current_active_user)) -> User:
     """
     Kiểm tra user có quyền nhà hàng hay không
     """
@@ -80,7 +116,7 @@ def get_current_restaurant_user(current_user: User = Depends(get_current_active_
         )
     return current_user
 
-def get_current_shipper_user(current_user: User = Depends(get_current_active_user)) -> User:
+async def get_current_shipper_user(current_user: User = Depends(get_current_active_user)) -> User:
     """
     Kiểm tra user có quyền shipper hay không
     """
@@ -91,7 +127,7 @@ def get_current_shipper_user(current_user: User = Depends(get_current_active_use
         )
     return current_user
 
-def get_current_customer_user(current_user: User = Depends(get_current_active_user)) -> User:
+async def get_current_customer_user(current_user: User = Depends(get_current_active_user)) -> User:
     """
     Kiểm tra user có quyền khách hàng hay không
     """
@@ -1,30 +1,57 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import update
+from typing import List, Optional
 
-from ...database.database import get_db
+from ...core.change_feed import publish_change
+from ...core.etag import etag_headers, etag_matches, make_etag
+from ...core.geo import address_geohash
+from ...core.serialization import fast_response
+from ...core.zones import address_zone
+from ...database.database import DBSession, get_db
+from ...database.queries import ADDRESS_FOR_USER, ADDRESSES_BY_USER
+from ...database.query_stats import query_budget
+from ...database.replicas import get_read_db, mark_recent_writer
 from ...models.user import User
 from ...models.address import Address
-from ...schemas.address import Address as AddressSchema, AddressCreate, AddressUpdate
-from ..deps import get_current_active_user
+from ...schemas.address import (
+    Address as AddressSchema,
+    AddressCreate,
+    AddressImportResult,
+    AddressNearby,
+    AddressUpdate,
+)
+from ...services.address_import import import_addresses
+from ...services.geo_service import MAX_SEARCH_RADIUS_M, find_addresses_within, find_nearest_addresses
+from ...services.version_service import get_addresses_version
+from ..deps import get_current_active_user, get_current_admin_user
 
 router = APIRouter()
 
-@router.get("/", response_model=List[AddressSchema])
+@router.get("/", response_model=List[AddressSchema], dependencies=[Depends(query_budget(3))])
 async def get_user_addresses(
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: DBSession = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
-    Lấy danh sách địa chỉ của người dùng hiện tại
+    Lấy danh sách địa chỉ của người dùng hiện tại, hỗ trợ ETag/If-None-Match
     """
-    addresses = db.query(Address).filter(Address.user_id == current_user.id).all()
-    return addresses
+    version = await get_addresses_version(db, current_user.id)
+    etag = make_etag(current_user.id, version)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=etag_headers(etag))
+
+    result = await db.scalars(ADDRESSES_BY_USER, {"user_id": current_user.id})
+    addresses = result.all()
+    headers = etag_headers(etag)
+    response.headers.update(headers)
+    return fast_response(List[AddressSchema], addresses, headers=headers)
 
 @router.post("/", response_model=AddressSchema, status_code=status.HTTP_201_CREATED)
 async def create_address(
     address: AddressCreate,
-    db: Session = Depends(get_db),
+    db: DBSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
@@ -32,11 +59,13 @@ async def create_address(
     """
     # Kiểm tra nếu đánh dấu là mặc định, cập nhật các địa chỉ khác
     if address.is_default:
-        db.query(Address).filter(
-            Address.user_id == current_user.id,
-            Address.is_default == True
-        ).update({"is_default": False})
-    
+        await db.execute(
+            update(Address).where(
+                Address.user_id == current_user.id,
+                Address.is_default == True
+            ).values(is_default=False)
+        )
+
     # Tạo đối tượng Address mới
     db_address = Address(
         user_id=current_user.id,
@@ -44,96 +73,163 @@ async def create_address(
         address=address.address,
         latitude=address.latitude,
         longitude=address.longitude,
+        geohash=address_geohash(address.latitude, address.longitude),
+        zone_id=address_zone(address.latitude, address.longitude),
         is_default=address.is_default
     )
-    
+
     db.add(db_address)
-    db.commit()
-    db.refresh(db_address)
+    await db.commit()
+    await db.refresh(db_address)
+    await mark_recent_writer(current_user.id)
+    await publish_change(current_user.id, "address.created", id=db_address.id)
     return db_address
 
+@router.post("/import", response_model=AddressImportResult)
+async def import_user_addresses(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(ndjson|csv)$"),
+    db: DBSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Import nhiều địa chỉ cho người dùng hiện tại từ body NDJSON hoặc CSV (có dòng tiêu đề).
+    Định dạng lấy từ tham số format, nếu không có thì suy ra từ Content-Type.
+    Dữ liệu hỏng giữa chừng (dòng quá dài, thiếu dấu nháy đóng) được báo trong errors,
+    các dòng hợp lệ trước đó vẫn được ghi.
+    """
+    file_format = format or ("csv" if "csv" in request.headers.get("content-type", "") else "ndjson")
+    result = await import_addresses(db, current_user.id, request.stream(), file_format)
+    if result["inserted"]:
+        await mark_recent_writer(current_user.id)
+        await publish_change(current_user.id, "address.imported", count=result["inserted"])
+    return result
+
+@router.get("/nearby", response_model=List[AddressNearby])
+async def get_nearby_addresses(
+    latitude: float = Query(..., ge=-90, le=90),
+    longitude: float = Query(..., ge=-180, le=180),
+    radius_m: float = Query(1000, gt=0, le=MAX_SEARCH_RADIUS_M),
+    limit: int = Query(50, ge=1, le=500),
+    db: DBSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_admin_user)  # Chỉ admin mới được tìm địa chỉ của mọi user
+):
+    """
+    Tìm các địa chỉ trong bán kính radius_m (mét) quanh một điểm
+    """
+    results = await find_addresses_within(db, latitude, longitude, radius_m, limit)
+    return [
+        AddressNearby(**AddressSchema.model_validate(address).model_dump(), distance_m=distance)
+        for address, distance in results
+    ]
+
+@router.get("/nearest", response_model=List[AddressNearby])
+async def get_nearest_addresses(
+    latitude: float = Query(..., ge=-90, le=90),
+    longitude: float = Query(..., ge=-180, le=180),
+    k: int = Query(10, ge=1, le=100),
+    db: DBSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_admin_user)  # Chỉ admin mới được tìm địa chỉ của mọi user
+):
+    """
+    Tìm k địa chỉ gần một điểm nhất
+    """
+    results = await find_nearest_addresses(db, latitude, longitude, k)
+    return [
+        AddressNearby(**AddressSchema.model_validate(address).model_dump(), distance_m=distance)
+        for address, distance in results
+    ]
+
 @router.get("/{address_id}", response_model=AddressSchema)
 async def get_address(
     address_id: int,
-    db: Session = Depends(get_db),
+    db: DBSession = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
     Lấy thông tin một địa chỉ cụ thể
     """
-    address = db.query(Address).filter(
-        Address.id == address_id,
-        Address.user_id == current_user.id
-    ).first()
-    
+    address = await db.scalar(
+        ADDRESS_FOR_USER, {"address_id": address_id, "user_id": current_user.id}
+    )
+
     if not address:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Không tìm thấy địa chỉ hoặc địa chỉ không thuộc về bạn"
         )
-    
+
     return address
 
 @router.put("/{address_id}", response_model=AddressSchema)
 async def update_address(
     address_id: int,
     address_update: AddressUpdate,
-    db: Session = Depends(get_db),
+    db: DBSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
     Cập nhật thông tin địa chỉ
     """
-    db_address = db.query(Address).filter(
-        Address.id == address_id,
-        Address.user_id == current_user.id
-    ).first()
-    
+    db_address = await db.scalar(
+        ADDRESS_FOR_USER, {"address_id": address_id, "user_id": current_user.id}
+    )
+
     if not db_address:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Không tìm thấy địa chỉ hoặc địa chỉ không thuộc về bạn"
         )
-    
+
     # Cập nhật các trường nếu có trong request
     update_data = address_update.dict(exclude_unset=True)
-    
+
     # Nếu đánh dấu là mặc định, cập nhật các địa chỉ khác
     if update_data.get('is_default'):
-        db.query(Address).filter(
-            Address.user_id == current_user.id,
-            Address.id != address_id,
-            Address.is_default == True
-        ).update({"is_default": False})
-    
+        await db.execute(
+            update(Address).where(
+                Address.user_id == current_user.id,
+                Address.id != address_id,
+                Address.is_default == True
+            ).values(is_default=False)
+        )
+
     # Cập nhật thông tin
     for key, value in update_data.items():
         setattr(db_address, key, value)
-    
-    db.commit()
-    db.refresh(db_address)
+
+    # Đồng bộ geohash và vùng giao hàng khi tọa độ thay đổi
+    if 'latitude' in update_data or 'longitude' in update_data:
+        db_address.geohash = address_geohash(db_address.latitude, db_address.longitude)
+        db_address.zone_id = address_zone(db_address.latitude, db_address.longitude)
+
+    await db.commit()
+    await db.refresh(db_address)
+    await mark_recent_writer(current_user.id)
+    await publish_change(current_user.id, "address.updated", id=address_id)
     return db_address
 
 @router.delete("/{address_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_address(
     address_id: int,
-    db: Session = Depends(get_db),
+    db: DBSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
     Xóa địa chỉ
     """
-    db_address = db.query(Address).filter(
-        Address.id == address_id,
-        Address.user_id == current_user.id
-    ).first()
-    
+    db_address = await db.scalar(
+        ADDRESS_FOR_USER, {"address_id": address_id, "user_id": current_user.id}
+    )
+
     if not db_address:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Không tìm thấy địa chỉ hoặc địa chỉ không thuộc về bạn"
         )
-    
-    db.delete(db_address)
-    db.commit()
-    return None 
\ No newline at end of file
+
+    await db.delete(db_address)
+    await db.commit()
+    await mark_recent_writer(current_user.id)
+    await publish_change(current_user.id, "address.deleted", id=address_id)
+    return None
\ No newline at end of file
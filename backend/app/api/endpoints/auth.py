@@ -1,58 +1,66 @@
-from datetime import timedelta
-from typing import Any
+from typing import Any, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from jose import JWTError
+from pydantic import ValidationError
 
-from ...core.config import settings
-from ...core.security import create_access_token
-from ...database.database import get_db
-from ...schemas.token import Token
+from ...core.rate_limit import login_rate_limiter
+from ...core.security import create_token_pair, decode_access_token
+from ...database.database import DBSession, get_db
+from ...database.replicas import mark_recent_writer
+from ...schemas.token import Token, TokenRefresh
 from ...schemas.user import UserCreate, UserLogin, UserChangePassword
 from ...services.user_service import (
     authenticate_user,
     create_user,
-    get_user_by_email,
-    change_user_password
+    change_user_password,
+    UserAlreadyExistsError,
 )
+from ...services.token_service import revoke_token, rotate_refresh_token
 from ...models.user import User
-from ..deps import get_current_active_user
+from ..deps import get_current_active_user, oauth2_scheme
 
 router = APIRouter()
 
+_CONFLICT_DETAILS = {
+    "email": "Email đã được sử dụng",
+    "username": "Tên đăng nhập đã được sử dụng",
+}
+
+
+def _client_ip(request: Request) -> Optional[str]:
+    return request.client.host if request.client else None
+
 
 @router.post("/register", response_model=Token)
-async def register(user_in: UserCreate, db: Session = Depends(get_db)) -> Any:
+async def register(user_in: UserCreate, db: DBSession = Depends(get_db)) -> Any:
     """
     Đăng ký tài khoản mới và trả về access token
     """
-    # Kiểm tra email đã tồn tại chưa
-    user = get_user_by_email(db, email=user_in.email)
-    if user:
+    # Tạo user mới; trùng email/username do unique index phát hiện ngay trong câu insert
+    try:
+        user = await create_user(db, user_create=user_in)
+    except UserAlreadyExistsError as exc:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email đã được sử dụng",
+            detail=_CONFLICT_DETAILS[exc.field],
         )
+
+    # Các lần đọc ngay sau đó của user mới đi về primary (replica có thể chưa có user)
+    await mark_recent_writer(user.id)
     
-    # Tạo user mới
-    user = create_user(db, user_in=user_in)
-    
-    # Tạo access token
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        subject=user.id, expires_delta=access_token_expires
-    )
-    
-    return {"access_token": access_token, "token_type": "bearer"}
+    # Tạo access token và refresh token
+    return create_token_pair(user.id)
 
 
 @router.post("/login", response_model=Token)
-async def login(user_in: UserLogin, db: Session = Depends(get_db)) -> Any:
+async def login(request: Request, user_in: UserLogin, db: DBSession = Depends(get_db)) -> Any:
     """
     Đăng nhập và lấy JWT access token
     """
-    user = authenticate_user(db, email=user_in.email, password=user_in.password)
+    await login_rate_limiter.check(user_in.email, _client_ip(request))
+    user = await authenticate_user(db, email=user_in.email, password=user_in.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -67,23 +75,21 @@ async def login(user_in: UserLogin, db: Session = Depends(get_db)) -> Any:
             detail="Tài khoản không còn hoạt động",
         )
     
-    # Tạo access token
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        subject=user.id, expires_delta=access_token_expires
-    )
-    
-    return {"access_token": access_token, "token_type": "bearer"}
+    # Tạo access token và refresh token
+    return create_token_pair(user.id)
 
 
 @router.post("/login/oauth", response_model=Token)
 async def login_oauth(
-    form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)
+    request: Request,
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: DBSession = Depends(get_db)
 ) -> Any:
     """
     OAuth2 compatible token login, để tương thích với OAuth2PasswordBearer
     """
-    user = authenticate_user(db, email=form_data.username, password=form_data.password)
+    await login_rate_limiter.check(form_data.username, _client_ip(request))
+    user = await authenticate_user(db, email=form_data.username, password=form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -98,26 +104,23 @@ async def login_oauth(
             detail="Tài khoản không còn hoạt động",
         )
     
-    # Tạo access token
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        subject=user.id, expires_delta=access_token_expires
-    )
-    
-    return {"access_token": access_token, "token_type": "bearer"}
+    # Tạo access token và refresh token
+    return create_token_pair(user.id)
 
 
 @router.post("/change-password")
 async def change_password(
+    request: Request,
     password_in: UserChangePassword,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: DBSession = Depends(get_db)
 ) -> Any:
     """
     Đổi mật khẩu cho tài khoản đã đăng nhập
     """
     # Xác thực mật khẩu hiện tại
-    user = authenticate_user(db, email=current_user.email, password=password_in.current_password)
+    await login_rate_limiter.check(current_user.email, _client_ip(request))
+    user = await authenticate_user(db, email=current_user.email, password=password_in.current_password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -125,6 +128,44 @@ async def change_password(
         )
     
     # Đổi mật khẩu
-    change_user_password(db, user=user, new_password=password_in.new_password)
+    await change_user_password(db, user=user, new_password=password_in.new_password)
     
-    return {"message": "Đổi mật khẩu thành công"} 
\ No newline at end of file
+    return {"message": "Đổi mật khẩu thành công"}
+
+
+@router.post("/refresh", response_model=Token)
+async def refresh_token(token_in: TokenRefresh, db: DBSession = Depends(get_db)) -> Any:
+    """
+    Đổi refresh token lấy cặp token mới (refresh token cũ bị thu hồi), không cần mật khẩu
+    """
+    tokens = await rotate_refresh_token(db, token_in.refresh_token)
+    if tokens is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token không hợp lệ hoặc đã được sử dụng",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return tokens
+
+
+@router.post("/logout")
+async def logout(
+    token_in: Optional[TokenRefresh] = None,
+    token: str = Depends(oauth2_scheme),
+    current_user: User = Depends(get_current_active_user),
+    db: DBSession = Depends(get_db)
+) -> Any:
+    """
+    Đăng xuất: thu hồi access token hiện tại và refresh token (nếu gửi kèm)
+    """
+    await revoke_token(db, decode_access_token(token))
+    if token_in is not None:
+        try:
+            refresh_data = decode_access_token(token_in.refresh_token)
+        except (JWTError, ValidationError):
+            refresh_data = None
+        # Chỉ thu hồi refresh token của chính user đang đăng xuất
+        if refresh_data is not None and refresh_data.sub == str(current_user.id):
+            await revoke_token(db, refresh_data)
+
+    return {"message": "Đăng xuất thành công"}
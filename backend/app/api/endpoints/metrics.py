@@ -0,0 +1,65 @@
+import secrets
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
+from fastapi.responses import PlainTextResponse
+
+from ...core.config import settings
+from ...core.metrics import registry
+from ...database.pool import pool_status
+from ...models.user import User
+from ..deps import get_current_admin_user
+
+router = APIRouter()
+
+def verify_metrics_token(authorization: Optional[str] = Header(None)) -> None:
+    """
+    Kiểm tra header Authorization: Bearer <METRICS_TOKEN> cho Prometheus scraper
+    """
+    if not settings.METRICS_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(token, settings.METRICS_TOKEN):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token metrics không hợp lệ",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+@router.get("/")
+async def get_metrics(
+    current_user: User = Depends(get_current_admin_user)  # Chỉ admin mới được xem metric
+) -> Dict[str, Any]:
+    """
+    Xem nhanh toàn bộ metric của tiến trình dưới dạng JSON
+    """
+    return registry.snapshot()
+
+@router.get("/db-pool")
+async def get_db_pool_status(
+    current_user: User = Depends(get_current_admin_user)
+) -> Dict[str, Any]:
+    """
+    Trạng thái connection pool: kết nối đang dùng, overflow, thời gian chờ và số lần timeout
+    """
+    return pool_status()
+
+@router.get("/startup")
+async def get_startup_report(
+    request: Request,
+    current_user: User = Depends(get_current_admin_user)
+) -> Dict[str, Any]:
+    """
+    Thời gian từng bước khởi động (làm nóng pool, truy vấn, serializer) của worker hiện tại
+    """
+    return getattr(request.app.state, "startup_report", {})
+
+@router.get("/prometheus", response_class=PlainTextResponse, dependencies=[Depends(verify_metrics_token)])
+async def get_prometheus_metrics() -> PlainTextResponse:
+    """
+    Metric theo định dạng Prometheus text exposition
+    """
+    return PlainTextResponse(
+        registry.render_prometheus(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
@@ -0,0 +1,93 @@
+import time
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from typing import List, Optional
+
+from ...core.config import settings
+from ...core.serialization import fast_response
+from ...core.shipper_locator import shipper_locator
+from ...database.database import DBSession
+from ...database.queries import ADDRESS_FOR_USER, DEFAULT_ADDRESS_FOR_USER
+from ...database.replicas import get_read_db
+from ...models.user import User
+from ...schemas.shipper import NearbyShipper, ShipperLocationUpdate
+from ..deps import get_current_active_user, get_current_shipper_user
+
+router = APIRouter()
+
+# Các vai trò được tìm shipper theo tọa độ bất kỳ; khách hàng chỉ tìm theo địa chỉ của mình
+COORDINATE_SEARCH_ROLES = ("admin", "restaurant")
+
+@router.put("/me/location", status_code=status.HTTP_204_NO_CONTENT)
+async def update_my_location(
+    location: ShipperLocationUpdate,
+    current_user: User = Depends(get_current_shipper_user)
+):
+    """
+    Cập nhật vị trí hiện tại của shipper (gọi vài giây một lần), chỉ ghi vào bộ nhớ, không ghi database
+    """
+    if location.available:
+        shipper_locator.update(current_user.id, location.latitude, location.longitude)
+    else:
+        shipper_locator.remove(current_user.id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+@router.delete("/me/location", status_code=status.HTTP_204_NO_CONTENT)
+async def clear_my_location(
+    current_user: User = Depends(get_current_shipper_user)
+):
+    """
+    Shipper ngừng nhận đơn: xóa vị trí khỏi danh sách tìm kiếm
+    """
+    shipper_locator.remove(current_user.id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+@router.get("/nearest", response_model=List[NearbyShipper])
+async def get_nearest_shippers(
+    k: int = Query(5, ge=1, le=50),
+    address_id: Optional[int] = None,
+    latitude: Optional[float] = Query(None, ge=-90, le=90),
+    longitude: Optional[float] = Query(None, ge=-180, le=180),
+    db: DBSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    k shipper đang sẵn sàng gần nhất với một địa chỉ của user hiện tại (address_id,
+    mặc định là địa chỉ mặc định), hoặc với tọa độ bất kỳ (chỉ admin và nhà hàng)
+    """
+    if latitude is not None or longitude is not None:
+        if current_user.role not in COORDINATE_SEARCH_ROLES:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Không có quyền tìm shipper theo tọa độ",
+            )
+        if latitude is None or longitude is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cần cả latitude và longitude",
+            )
+    else:
+        if address_id is not None:
+            address = await db.scalar(
+                ADDRESS_FOR_USER, {"address_id": address_id, "user_id": current_user.id}
+            )
+        else:
+            address = await db.scalar(DEFAULT_ADDRESS_FOR_USER, {"user_id": current_user.id})
+        if address is None or address.latitude is None or address.longitude is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Không tìm thấy địa chỉ có tọa độ",
+            )
+        latitude, longitude = address.latitude, address.longitude
+
+    matches = shipper_locator.nearest(latitude, longitude, k, settings.SHIPPER_SEARCH_MAX_RADIUS_M)
+    now = time.monotonic()
+    return fast_response(List[NearbyShipper], [
+        {
+            "shipper_id": position.shipper_id,
+            "latitude": position.latitude,
+            "longitude": position.longitude,
+            "distance_m": round(distance, 1),
+            "location_age_seconds": round(now - position.updated_at, 1),
+        }
+        for position, distance in matches
+    ])
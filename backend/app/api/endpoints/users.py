@@ -1,50 +1,189 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session, joinedload
-from typing import List
+import asyncio
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import joinedload, selectinload
+from typing import List, Optional
 
-from ...database.database import get_db
+from ...core.change_feed import subscribe_changes
+from ...core.config import settings
+from ...core.etag import etag_headers, etag_matches, make_etag
+from ...core.pagination import decode_cursor, encode_cursor
+from ...core.serialization import fast_response
+from ...database.database import DBSession, get_db
+from ...database.queries import USER_WITH_ADDRESSES
+from ...database.query_stats import query_budget
+from ...database.replicas import get_read_db
 from ...models.user import User
 from ...models.address import Address
-from ...schemas.user import User as UserSchema, UserUpdate
+from ...schemas.user import User as UserSchema, UserPage, UserSearchResult, UserUpdate
+from ...services.user_export import export_users_csv, export_users_ndjson
+from ...services.user_search import estimate_search_total, search_users
 from ...services.user_service import update_user
-from ..deps import get_current_active_user, get_current_admin_user
+from ...services.version_service import get_profile_version
+from ..deps import get_current_active_user, get_current_admin_user, get_current_stream_user
 
 router = APIRouter()
 
 @router.get("/", response_model=List[UserSchema])
 async def get_users(
-    skip: int = 0, 
-    limit: int = 100, 
-    db: Session = Depends(get_db),
+    skip: int = 0,
+    limit: int = 100,
+    db: DBSession = Depends(get_read_db),
     current_user: User = Depends(get_current_admin_user)  # Chỉ admin mới được xem danh sách
 ):
     # Truy vấn users với eager loading addresses
-    users = db.query(User).options(
-        # Load mối quan hệ addresses để tránh N+1 query
-        joinedload(User.addresses)
-    ).offset(skip).limit(limit).all()
-    
-    return users
-
-@router.get("/me", response_model=UserSchema)
+    result = await db.execute(
+        select(User).options(
+            # Load mối quan hệ addresses để tránh N+1 query
+            joinedload(User.addresses)
+        ).offset(skip).limit(limit)
+    )
+    users = result.unique().scalars().all()
+
+    return fast_response(List[UserSchema], users)
+
+@router.get("/page", response_model=UserPage)
+async def get_users_page(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: DBSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_admin_user)  # Chỉ admin mới được xem danh sách
+):
+    """
+    Lấy danh sách users theo cursor (keyset) sắp xếp theo (created_at, id).
+    Chi phí mỗi trang không phụ thuộc vào độ sâu, truyền next_cursor để lấy trang kế tiếp.
+    """
+    query = select(User).options(
+        # Load addresses bằng một truy vấn IN riêng để LIMIT không bị bọc subquery
+        selectinload(User.addresses)
+    ).order_by(User.created_at, User.id).limit(limit + 1)
+
+    if cursor:
+        try:
+            created_at, last_id = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Cursor không hợp lệ")
+        query = query.where(tuple_(User.created_at, User.id) > tuple_(created_at, last_id))
+
+    users = (await db.scalars(query)).all()
+
+    # Lấy dư một bản ghi để biết còn trang tiếp theo hay không
+    next_cursor = None
+    if len(users) > limit:
+        users = users[:limit]
+        next_cursor = encode_cursor(users[-1].created_at, users[-1].id)
+
+    return fast_response(UserPage, {"items": users, "next_cursor": next_cursor})
+
+@router.get("/search", response_model=UserSearchResult)
+async def search_users_endpoint(
+    q: str = Query(..., min_length=3, max_length=100),
+    role: Optional[str] = None,
+    is_active: Optional[bool] = None,
+    limit: int = Query(20, ge=1, le=100),
+    with_total: bool = False,
+    db: DBSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_admin_user)  # Chỉ admin mới được tìm kiếm
+):
+    """
+    Tìm user theo một phần username, email, họ tên hoặc số điện thoại (tối thiểu 3 ký tự
+    để dùng được index trigram), lọc theo role/is_active. with_total=true trả thêm số kết quả
+    ước lượng (không đếm toàn bộ bảng).
+    """
+    users = await search_users(db, q, role=role, is_active=is_active, limit=limit)
+    total_estimate = None
+    if with_total:
+        total_estimate = await estimate_search_total(db, q, role=role, is_active=is_active)
+
+    return fast_response(UserSearchResult, {"items": users, "total_estimate": total_estimate})
+
+@router.get("/export")
+async def export_users(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    db: DBSession = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)  # Chỉ admin mới được export
+):
+    """
+    Export toàn bộ users kèm địa chỉ dưới dạng NDJSON hoặc CSV, stream với bộ nhớ không đổi
+    """
+    # Trả kết nối của session xác thực về pool; stream dùng session riêng
+    await db.close()
+
+    if format == "csv":
+        return StreamingResponse(
+            export_users_csv(),
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="users.csv"'},
+        )
+    return StreamingResponse(
+        export_users_ndjson(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="users.ndjson"'},
+    )
+
+@router.get("/me", response_model=UserSchema, dependencies=[Depends(query_budget(3))])
 async def get_current_user_info(
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: DBSession = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
-    Lấy thông tin user hiện tại kèm địa chỉ
+    Lấy thông tin user hiện tại kèm địa chỉ, hỗ trợ ETag/If-None-Match
     """
+    # Kiểm tra phiên bản bằng truy vấn tổng hợp rẻ trước khi dựng response đầy đủ
+    version = await get_profile_version(db, current_user.id)
+    etag = make_etag(current_user.id, version)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=etag_headers(etag))
+
     # Load lại user từ database để đảm bảo có thông tin địa chỉ
-    user = db.query(User).options(
-        joinedload(User.addresses)
-    ).filter(User.id == current_user.id).first()
-    
-    return user
+    result = await db.execute(USER_WITH_ADDRESSES, {"user_id": current_user.id})
+    user = result.unique().scalars().first()
+
+    headers = etag_headers(etag)
+    response.headers.update(headers)
+    return fast_response(UserSchema, user, headers=headers)
+
+async def _change_events(user_id: int):
+    async with subscribe_changes(user_id) as queue:
+        # Client tự kết nối lại sau 3 giây nếu mất kết nối
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), settings.CHANGE_FEED_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                # Giữ kết nối qua proxy/load balancer khi không có sự kiện
+                yield ": keep-alive\n\n"
+                continue
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+@router.get("/me/events")
+async def get_my_change_events(
+    db: DBSession = Depends(get_db),
+    current_user: User = Depends(get_current_stream_user)
+):
+    """
+    Change feed của user hiện tại dạng server-sent events: user.updated, address.created/updated/
+    deleted/imported và resync (cần tải lại toàn bộ). Nhận sự kiện rồi mới gọi lại GET /users/me hoặc
+    GET /addresses/ (kèm If-None-Match) thay vì gọi định kỳ.
+    Trình duyệt (EventSource) truyền token qua ?access_token=... vì không đặt được header.
+    """
+    # Trả kết nối của session xác thực về pool; stream có thể mở rất lâu
+    await db.close()
+
+    return StreamingResponse(
+        _change_events(current_user.id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @router.get("/{user_id}", response_model=UserSchema)
 async def get_user(
-    user_id: int, 
-    db: Session = Depends(get_db),
+    user_id: int,
+    db: DBSession = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
     # Chỉ cho phép user xem thông tin của chính mình hoặc admin xem thông tin của bất kỳ ai
@@ -53,37 +192,35 @@ async def get_user(
             status_code=403,
             detail="Không có quyền truy cập thông tin của người dùng khác"
         )
-        
-    user = db.query(User).options(
-        joinedload(User.addresses)
-    ).filter(User.id == user_id).first()
-    
+
+    result = await db.execute(USER_WITH_ADDRESSES, {"user_id": user_id})
+    user = result.unique().scalars().first()
+
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
-    return user
+    return fast_response(UserSchema, user)
 
-@router.put("/{user_id}", response_model=UserSchema)
+@router.put("/{user_id}", response_model=UserSchema, dependencies=[Depends(query_budget(5))])
 async def update_user_info(
     user_id: int,
     user_update: UserUpdate,
-    db: Session = Depends(get_db),
+    db: DBSession = Depends(get_db),
     current_user: User = Depends(get_current_admin_user)  # Chỉ admin mới có quyền cập nhật
 ):
     """
     Cập nhật thông tin người dùng (chỉ admin mới có quyền)
     """
     # Kiểm tra xem người dùng cần cập nhật có tồn tại không
-    updated_user = update_user(db, user_id, user_update)
-    
+    updated_user = await update_user(db, user_id, user_update)
+
     if not updated_user:
         raise HTTPException(
             status_code=404,
             detail="Không tìm thấy người dùng để cập nhật"
         )
-    
+
     # Load lại user để lấy thông tin địa chỉ
-    user = db.query(User).options(
-        joinedload(User.addresses)
-    ).filter(User.id == user_id).first()
-    
-    return user 
\ No newline at end of file
+    result = await db.execute(USER_WITH_ADDRESSES, {"user_id": user_id})
+    user = result.unique().scalars().first()
+
+    return user
\ No newline at end of file
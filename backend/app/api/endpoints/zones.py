@@ -0,0 +1,58 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import List
+
+from ...core.zones import ZoneFormatError, get_zone_index
+from ...models.user import User
+from ...schemas.address import Zone as ZoneSchema, ZoneLookup, ZoneReassignResult
+from ...services.zone_service import reassign_status, start_reassign_job
+from ..deps import get_current_active_user, get_current_admin_user
+
+router = APIRouter()
+
+@router.get("/", response_model=List[ZoneSchema])
+async def get_zones(
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Danh sách vùng giao hàng đang nạp trong bộ nhớ
+    """
+    return [
+        {"id": zone.id, "name": zone.name, "bbox": list(zone.bbox)}
+        for zone in get_zone_index().zones
+    ]
+
+@router.get("/lookup", response_model=ZoneLookup)
+async def lookup_zone(
+    latitude: float = Query(..., ge=-90, le=90),
+    longitude: float = Query(..., ge=-180, le=180),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Vùng giao hàng chứa một tọa độ (zone_id null nếu nằm ngoài mọi vùng)
+    """
+    return {"zone_id": get_zone_index().zone_id_at(latitude, longitude)}
+
+@router.post("/reassign", response_model=ZoneReassignResult, status_code=status.HTTP_202_ACCEPTED)
+async def reassign_zones(
+    current_user: User = Depends(get_current_admin_user)  # Chỉ admin mới được chạy job
+):
+    """
+    Nạp lại file vùng giao hàng (DELIVERY_ZONES_PATH) và gán lại vùng cho mọi địa chỉ ở nền.
+    Các worker khác tự nạp lại file khi thấy mtime đổi (trong DELIVERY_ZONE_RELOAD_SECONDS giây);
+    nếu tắt tự nạp lại (0) thì cần khởi động lại các worker. Theo dõi tiến trình bằng GET /zones/reassign.
+    """
+    try:
+        return start_reassign_job()
+    except ZoneFormatError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    except RuntimeError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc))
+
+@router.get("/reassign", response_model=ZoneReassignResult)
+async def get_reassign_status(
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Trạng thái lần chạy gần nhất của job gán lại vùng trong worker này
+    """
+    return reassign_status()
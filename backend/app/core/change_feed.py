@@ -0,0 +1,236 @@
+"""
+Change feed theo user: các thao tác ghi phát sự kiện vào kênh của user, client đăng ký một lần
+(GET /users/me/events, server-sent events) thay vì gọi lại liên tục các endpoint đọc.
+
+Sự kiện chỉ báo "có thay đổi" (loại, id bản ghi); client tự tải lại dữ liệu, thường chỉ tốn một
+phản hồi 304 nhờ ETag. Broker mặc định chạy trong tiến trình; khi chạy nhiều worker hoặc nhiều máy,
+đặt CHANGE_FEED_BROKER=postgres để chuyển sự kiện qua LISTEN/NOTIFY của PostgreSQL.
+"""
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, Optional, Set
+
+from .config import settings
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+CHANGE_EVENTS_PUBLISHED = registry.counter(
+    "change_feed_events_published_total",
+    "Số sự kiện thay đổi được phát theo loại",
+    ["type"],
+)
+CHANGE_EVENTS_DROPPED = registry.counter(
+    "change_feed_queue_overflow_total",
+    "Số lần hàng đợi của một subscriber bị đầy và được thay bằng sự kiện resync",
+)
+
+# Client nhận sự kiện này cần tải lại toàn bộ dữ liệu (đã có thể mất sự kiện)
+RESYNC_EVENT = {"type": "resync"}
+
+
+class ChangeBroker:
+    """
+    Giao diện broker chuyển sự kiện thay đổi tới các subscriber theo user_id
+    """
+
+    @property
+    def subscriber_count(self) -> int:
+        return 0
+
+    async def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    async def publish(self, user_id: int, event: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def subscribe(self, user_id: int) -> Any:
+        """
+        Async context manager trả về asyncio.Queue nhận sự kiện của user_id
+        """
+        raise NotImplementedError
+
+
+class InProcessBroker(ChangeBroker):
+    """
+    Broker trong tiến trình: mỗi subscriber một hàng đợi giới hạn kích thước.
+    Subscriber đọc chậm không chặn người phát: hàng đợi đầy bị xóa và thay bằng sự kiện resync.
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._subscribers: Dict[int, Set["asyncio.Queue[Dict[str, Any]]"]] = {}
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    def _offer(self, queue: "asyncio.Queue[Dict[str, Any]]", event: Dict[str, Any]) -> None:
+        if queue.full():
+            CHANGE_EVENTS_DROPPED.inc()
+            while not queue.empty():
+                queue.get_nowait()
+            event = RESYNC_EVENT
+        queue.put_nowait(event)
+
+    def deliver(self, user_id: int, event: Dict[str, Any]) -> None:
+        for queue in self._subscribers.get(user_id, ()):
+            self._offer(queue, event)
+
+    def broadcast(self, event: Dict[str, Any]) -> None:
+        for queues in self._subscribers.values():
+            for queue in queues:
+                self._offer(queue, event)
+
+    async def publish(self, user_id: int, event: Dict[str, Any]) -> None:
+        self.deliver(user_id, event)
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: int) -> AsyncIterator["asyncio.Queue[Dict[str, Any]]"]:
+        queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(user_id, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            queues = self._subscribers.get(user_id)
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    del self._subscribers[user_id]
+
+
+class PostgresNotifyBroker(ChangeBroker):
+    """
+    Phát sự kiện bằng pg_notify và nghe LISTEN trên một kết nối asyncpg riêng của mỗi worker;
+    sự kiện nhận được chuyển tới subscriber cục bộ qua InProcessBroker.
+    Mất kết nối thì tự kết nối lại và gửi resync cho mọi subscriber (có thể đã lỡ sự kiện).
+    """
+
+    def __init__(self, dsn: str, channel: str, queue_size: int):
+        self.dsn = dsn
+        self.channel = channel
+        self._local = InProcessBroker(queue_size)
+        self._connection: Any = None
+        self._lock = asyncio.Lock()
+        self._closing = False
+        self._reconnect_task: Optional["asyncio.Task[None]"] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return self._local.subscriber_count
+
+    async def _connect(self) -> None:
+        import asyncpg  # chỉ cần khi dùng broker PostgreSQL
+
+        connection = await asyncpg.connect(self.dsn)
+        await connection.add_listener(self.channel, self._on_notify)
+        connection.add_termination_listener(self._on_terminated)
+        self._connection = connection
+
+    def _on_notify(self, connection: Any, pid: int, channel: str, payload: str) -> None:
+        try:
+            message = json.loads(payload)
+            self._local.deliver(int(message["user_id"]), message["event"])
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Bỏ qua thông báo change feed không hợp lệ: %r", payload)
+
+    def _on_terminated(self, connection: Any) -> None:
+        if self._closing:
+            return
+        logger.warning("Mất kết nối LISTEN của change feed, đang kết nối lại")
+        self._connection = None
+        self._reconnect_task = asyncio.get_running_loop().create_task(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        while not self._closing:
+            try:
+                async with self._lock:
+                    if self._connection is None:
+                        await self._connect()
+                self._local.broadcast(RESYNC_EVENT)
+                return
+            except Exception:
+                logger.exception("Không kết nối lại được change feed")
+                await asyncio.sleep(1)
+
+    async def start(self) -> None:
+        await self._connect()
+
+    async def close(self) -> None:
+        self._closing = True
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+    async def publish(self, user_id: int, event: Dict[str, Any]) -> None:
+        payload = json.dumps({"user_id": user_id, "event": event})
+        async with self._lock:
+            if self._connection is None:
+                await self._connect()
+            # Một kết nối asyncpg chỉ chạy một lệnh tại một thời điểm nên cần khóa
+            await self._connection.execute("SELECT pg_notify($1, $2)", self.channel, payload)
+
+    def subscribe(self, user_id: int) -> Any:
+        return self._local.subscribe(user_id)
+
+
+def _create_broker() -> ChangeBroker:
+    if settings.CHANGE_FEED_BROKER == "postgres":
+        return PostgresNotifyBroker(
+            settings.DATABASE_URL, settings.CHANGE_FEED_CHANNEL, settings.CHANGE_FEED_QUEUE_SIZE
+        )
+    return InProcessBroker(settings.CHANGE_FEED_QUEUE_SIZE)
+
+
+change_broker = _create_broker()
+
+CHANGE_FEED_SUBSCRIBERS = registry.gauge(
+    "change_feed_subscribers",
+    "Số kết nối change feed đang mở trong worker",
+    function=lambda: change_broker.subscriber_count,
+)
+
+
+def set_change_broker(broker: ChangeBroker) -> None:
+    """
+    Thay broker (ví dụ broker dùng Redis pub/sub); gọi trước khi app nhận request
+    """
+    global change_broker
+    change_broker = broker
+
+
+async def start_change_feed() -> None:
+    await change_broker.start()
+
+
+async def stop_change_feed() -> None:
+    await change_broker.close()
+
+
+def subscribe_changes(user_id: int) -> Any:
+    """
+    Đăng ký nhận sự kiện của user (async context manager trả về asyncio.Queue)
+    """
+    return change_broker.subscribe(user_id)
+
+
+async def publish_change(user_id: int, event_type: str, **data: Any) -> None:
+    """
+    Phát sự kiện thay đổi cho user sau khi dữ liệu đã commit.
+    Lỗi broker chỉ được ghi log, không làm hỏng thao tác ghi đã thành công.
+    """
+    event = {"type": event_type, "at": datetime.now(timezone.utc).isoformat(), **data}
+    try:
+        await change_broker.publish(user_id, event)
+    except Exception:
+        logger.exception("Không phát được sự kiện %s cho user %s", event_type, user_id)
+        return
+    CHANGE_EVENTS_PUBLISHED.labels(event_type).inc()
@@ -46,11 +46,96 @@ class Settings(BaseSettings):
     
     # Xây dựng chuỗi kết nối database
     DATABASE_URL: str = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_SERVER}:{POSTGRES_PORT}/{POSTGRES_DB}"
+    ASYNC_DATABASE_URL: str = f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_SERVER}:{POSTGRES_PORT}/{POSTGRES_DB}"
+    
+    # Dùng AsyncSession (asyncpg) cho các endpoint; False để quay về Session đồng bộ (so sánh A/B)
+    DB_ASYNC: bool = os.getenv("DB_ASYNC", "True").lower() in ("true", "1", "t")
+
+    # Connection pool (mỗi worker); (DB_POOL_SIZE + DB_MAX_OVERFLOW) x số worker < max_connections
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "True").lower() in ("true", "1", "t")
+
+    # Khởi động: mở sẵn kết nối pool, chạy trước các truy vấn nóng và dựng serializer trước khi nhận request
+    STARTUP_WARMUP: bool = os.getenv("STARTUP_WARMUP", "True").lower() in ("true", "1", "t")
+    DB_POOL_WARMUP_CONNECTIONS: int = int(os.getenv("DB_POOL_WARMUP_CONNECTIONS", "2"))
+
+    # Read replica cho các endpoint chỉ đọc, danh sách URL phân tách bằng dấu phẩy
+    # (READ_REPLICA_URLS cho chế độ đồng bộ, ASYNC_READ_REPLICA_URLS khi bật DB_ASYNC)
+    READ_REPLICA_URLS: str = os.getenv("READ_REPLICA_URLS", "")
+    ASYNC_READ_REPLICA_URLS: str = os.getenv("ASYNC_READ_REPLICA_URLS", "")
+    # Sau khi user ghi dữ liệu, các lần đọc của user đó đi về primary trong khoảng này (giây)
+    READ_YOUR_WRITES_SECONDS: int = int(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+    # Replica lỗi kết nối bị loại khỏi vòng chọn trong khoảng này trước khi thử lại (giây)
+    REPLICA_RETRY_SECONDS: int = int(os.getenv("REPLICA_RETRY_SECONDS", "10"))
     
     # JWT Settings
     SECRET_KEY: str = os.getenv("SECRET_KEY")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30  # 30 phút
+    # Số token đã xác thực chữ ký được cache (0 = tắt cache)
+    JWT_CACHE_MAX_SIZE: int = int(os.getenv("JWT_CACHE_MAX_SIZE", "10000"))
+    REFRESH_TOKEN_EXPIRE_DAYS: int = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "30"))
+    # Chu kỳ dựng lại danh sách token bị thu hồi từ database và tỉ lệ dương tính giả của Bloom filter
+    REVOCATION_REFRESH_SECONDS: int = int(os.getenv("REVOCATION_REFRESH_SECONDS", "30"))
+    REVOCATION_BLOOM_FP_RATE: float = float(os.getenv("REVOCATION_BLOOM_FP_RATE", "0.001"))
+    # Chu kỳ xóa các dòng revoked_tokens đã hết hạn (giây)
+    REVOKED_TOKEN_PURGE_SECONDS: int = int(os.getenv("REVOKED_TOKEN_PURGE_SECONDS", "3600"))
+
+    # Encode response danh sách/hồ sơ thẳng ra bytes, bỏ qua bước chuyển đổi của FastAPI
+    FAST_SERIALIZATION: bool = os.getenv("FAST_SERIALIZATION", "True").lower() in ("true", "1", "t")
+
+    # Đếm truy vấn SQL theo request: header phản hồi, ngưỡng N+1 và chế độ strict cho test
+    SQL_ACCOUNTING_HEADERS: bool = os.getenv("SQL_ACCOUNTING_HEADERS", "False").lower() in ("true", "1", "t")
+    SQL_N_PLUS_ONE_THRESHOLD: int = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "5"))
+    SQL_QUERY_BUDGET_STRICT: bool = os.getenv("SQL_QUERY_BUDGET_STRICT", "False").lower() in ("true", "1", "t")
+
+    # Token bảo vệ endpoint Prometheus /metrics/prometheus (để trống = tắt endpoint)
+    METRICS_TOKEN: Optional[str] = os.getenv("METRICS_TOKEN")
+
+    # Process pool dùng cho hash/verify mật khẩu (0 = chạy trực tiếp trong tiến trình)
+    HASH_POOL_SIZE: int = int(os.getenv("HASH_POOL_SIZE", "2"))
+    # Số yêu cầu hash tối đa được xếp hàng chờ khi mọi worker đều bận
+    HASH_QUEUE_DEPTH: int = int(os.getenv("HASH_QUEUE_DEPTH", "64"))
+    # Số rounds sha256_crypt cho hash mới (0 = mặc định passlib); chọn bằng python -m app.core.hash_calibration
+    PASSWORD_HASH_ROUNDS: int = int(os.getenv("PASSWORD_HASH_ROUNDS", "0"))
+    # Thời gian verify mục tiêu (ms) để tự hiệu chỉnh rounds khi khởi động (0 = không hiệu chỉnh)
+    PASSWORD_HASH_TARGET_MS: int = int(os.getenv("PASSWORD_HASH_TARGET_MS", "0"))
+
+    # Giới hạn số lần thử mật khẩu trong cửa sổ trượt (0 = không giới hạn)
+    LOGIN_RATE_LIMIT_WINDOW_SECONDS: int = int(os.getenv("LOGIN_RATE_LIMIT_WINDOW_SECONDS", "60"))
+    LOGIN_RATE_LIMIT_PER_EMAIL: int = int(os.getenv("LOGIN_RATE_LIMIT_PER_EMAIL", "10"))
+    LOGIN_RATE_LIMIT_PER_IP: int = int(os.getenv("LOGIN_RATE_LIMIT_PER_IP", "50"))
+
+    # Cache thông tin user đã xác thực (0 = tắt cache)
+    PRINCIPAL_CACHE_TTL_SECONDS: int = int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+    PRINCIPAL_CACHE_MAX_SIZE: int = int(os.getenv("PRINCIPAL_CACHE_MAX_SIZE", "10000"))
+
+    # Số dòng ghi trong một câu lệnh INSERT khi import địa chỉ hàng loạt
+    ADDRESS_IMPORT_BATCH_SIZE: int = int(os.getenv("ADDRESS_IMPORT_BATCH_SIZE", "500"))
+    # File GeoJSON (FeatureCollection) chứa đa giác vùng giao hàng (để trống = không chia vùng)
+    DELIVERY_ZONES_PATH: str = os.getenv("DELIVERY_ZONES_PATH", "")
+    # Kích thước ô lưới (độ) của chỉ mục vùng giao hàng, 0.01 độ ~ 1.1 km
+    DELIVERY_ZONE_GRID_DEGREES: float = float(os.getenv("DELIVERY_ZONE_GRID_DEGREES", "0.01"))
+    # Chu kỳ mỗi worker kiểm tra file vùng có đổi không để tự nạp lại (giây, 0 = chỉ nạp khi khởi động)
+    DELIVERY_ZONE_RELOAD_SECONDS: int = int(os.getenv("DELIVERY_ZONE_RELOAD_SECONDS", "5"))
+    # Số địa chỉ đọc và gán lại vùng mỗi lượt trong job gán lại vùng
+    ZONE_REASSIGN_BATCH_SIZE: int = int(os.getenv("ZONE_REASSIGN_BATCH_SIZE", "10000"))
+    # Lưới vị trí shipper trong bộ nhớ: kích thước ô (độ), thời gian một vị trí còn hiệu lực (giây)
+    # và bán kính tìm shipper gần nhất tối đa (mét)
+    SHIPPER_GRID_DEGREES: float = float(os.getenv("SHIPPER_GRID_DEGREES", "0.01"))
+    SHIPPER_LOCATION_TTL_SECONDS: int = int(os.getenv("SHIPPER_LOCATION_TTL_SECONDS", "60"))
+    SHIPPER_SEARCH_MAX_RADIUS_M: float = float(os.getenv("SHIPPER_SEARCH_MAX_RADIUS_M", "20000"))
+    # Change feed (GET /users/me/events): broker "inprocess" (một worker) hoặc "postgres" (LISTEN/NOTIFY),
+    # kênh NOTIFY, số sự kiện tối đa chờ gửi cho mỗi kết nối và chu kỳ gửi keep-alive (giây)
+    CHANGE_FEED_BROKER: str = os.getenv("CHANGE_FEED_BROKER", "inprocess")
+    CHANGE_FEED_CHANNEL: str = os.getenv("CHANGE_FEED_CHANNEL", "spotifood_changes")
+    CHANGE_FEED_QUEUE_SIZE: int = int(os.getenv("CHANGE_FEED_QUEUE_SIZE", "100"))
+    CHANGE_FEED_HEARTBEAT_SECONDS: int = int(os.getenv("CHANGE_FEED_HEARTBEAT_SECONDS", "15"))
+    # Số dòng đọc mỗi lần từ server-side cursor khi export
+    EXPORT_YIELD_PER: int = int(os.getenv("EXPORT_YIELD_PER", "1000"))
 
     class Config:
         case_sensitive = True
@@ -0,0 +1,35 @@
+import hashlib
+from typing import Any, Dict, Optional
+
+
+def make_etag(*parts: Any) -> str:
+    """
+    Tạo weak ETag từ các giá trị phiên bản (updated_at, số lượng, id lớn nhất...)
+    """
+    digest = hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    So khớp header If-None-Match với ETag theo kiểu weak comparison
+    """
+    if not if_none_match:
+        return False
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def etag_headers(etag: str) -> Dict[str, str]:
+    """
+    Header đi kèm response có ETag: client được lưu nhưng phải xác thực lại mỗi lần dùng
+    """
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
@@ -0,0 +1,152 @@
+import math
+from typing import List, Optional, Tuple
+
+# Độ chính xác geohash lưu trong database (~4.8m x 4.8m)
+GEOHASH_PRECISION = 9
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEGREE = 111320.0
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_BASE32_INDEX = {char: index for index, char in enumerate(_BASE32)}
+
+
+def geohash_encode(latitude: float, longitude: float, precision: int = GEOHASH_PRECISION) -> str:
+    """
+    Mã hóa tọa độ thành geohash với độ dài precision
+    """
+    lat_min, lat_max = -90.0, 90.0
+    lng_min, lng_max = -180.0, 180.0
+    chars = []
+    bit = 0
+    value = 0
+    even = True  # Bit chẵn dùng cho kinh độ
+    while len(chars) < precision:
+        if even:
+            mid = (lng_min + lng_max) / 2
+            if longitude >= mid:
+                value = (value << 1) | 1
+                lng_min = mid
+            else:
+                value <<= 1
+                lng_max = mid
+        else:
+            mid = (lat_min + lat_max) / 2
+            if latitude >= mid:
+                value = (value << 1) | 1
+                lat_min = mid
+            else:
+                value <<= 1
+                lat_max = mid
+        even = not even
+        bit += 1
+        if bit == 5:
+            chars.append(_BASE32[value])
+            bit = 0
+            value = 0
+    return "".join(chars)
+
+
+def geohash_bbox(geohash: str) -> Tuple[float, float, float, float]:
+    """
+    Trả về (lat_min, lat_max, lng_min, lng_max) của ô geohash
+    """
+    lat_min, lat_max = -90.0, 90.0
+    lng_min, lng_max = -180.0, 180.0
+    even = True
+    for char in geohash:
+        value = _BASE32_INDEX[char]
+        for shift in range(4, -1, -1):
+            bit = (value >> shift) & 1
+            if even:
+                mid = (lng_min + lng_max) / 2
+                if bit:
+                    lng_min = mid
+                else:
+                    lng_max = mid
+            else:
+                mid = (lat_min + lat_max) / 2
+                if bit:
+                    lat_min = mid
+                else:
+                    lat_max = mid
+            even = not even
+    return lat_min, lat_max, lng_min, lng_max
+
+
+def geohash_cell_size(precision: int) -> Tuple[float, float]:
+    """
+    Kích thước (độ vĩ, độ kinh) của một ô geohash với độ dài precision
+    """
+    bits = precision * 5
+    lng_bits = (bits + 1) // 2
+    lat_bits = bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+
+def geohash_neighbors(geohash: str) -> List[str]:
+    """
+    Trả về ô geohash hiện tại cùng tối đa 8 ô lân cận (không trùng lặp)
+    """
+    lat_min, lat_max, lng_min, lng_max = geohash_bbox(geohash)
+    lat_step = lat_max - lat_min
+    lng_step = lng_max - lng_min
+    center_lat = (lat_min + lat_max) / 2
+    center_lng = (lng_min + lng_max) / 2
+    cells = []
+    for dlat in (-1, 0, 1):
+        latitude = center_lat + dlat * lat_step
+        if latitude < -90.0 or latitude > 90.0:
+            continue
+        for dlng in (-1, 0, 1):
+            longitude = (center_lng + dlng * lng_step + 180.0) % 360.0 - 180.0
+            cell = geohash_encode(latitude, longitude, len(geohash))
+            if cell not in cells:
+                cells.append(cell)
+    return cells
+
+
+def precision_for_radius(latitude: float, radius_m: float) -> int:
+    """
+    Chọn độ dài geohash lớn nhất sao cho một ô vẫn rộng hơn bán kính,
+    khi đó ô trung tâm và 8 ô lân cận phủ kín toàn bộ vòng tròn tìm kiếm
+    """
+    cos_lat = max(math.cos(math.radians(latitude)), 1e-6)
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        lat_size, lng_size = geohash_cell_size(precision)
+        if (
+            lat_size * METERS_PER_DEGREE >= radius_m
+            and lng_size * METERS_PER_DEGREE * cos_lat >= radius_m
+        ):
+            return precision
+    return 1
+
+
+def bounding_box(latitude: float, longitude: float, radius_m: float) -> Tuple[float, float, float, float]:
+    """
+    Khung chữ nhật (lat_min, lat_max, lng_min, lng_max) bao quanh vòng tròn bán kính radius_m
+    """
+    dlat = radius_m / METERS_PER_DEGREE
+    cos_lat = max(math.cos(math.radians(latitude)), 1e-6)
+    dlng = min(radius_m / (METERS_PER_DEGREE * cos_lat), 180.0)
+    return latitude - dlat, latitude + dlat, longitude - dlng, longitude + dlng
+
+
+def haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """
+    Khoảng cách đường tròn lớn (mét) giữa hai tọa độ
+    """
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def address_geohash(latitude: Optional[float], longitude: Optional[float]) -> Optional[str]:
+    """
+    Geohash lưu cho một địa chỉ, None nếu địa chỉ chưa có tọa độ
+    """
+    if latitude is None or longitude is None:
+        return None
+    return geohash_encode(float(latitude), float(longitude))
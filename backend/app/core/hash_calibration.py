@@ -0,0 +1,56 @@
+"""
+Hiệu chỉnh số rounds sha256_crypt theo thời gian verify mục tiêu trên phần cứng triển khai.
+
+Chạy từ thư mục backend rồi đặt PASSWORD_HASH_ROUNDS giống nhau cho mọi instance:
+    python -m app.core.hash_calibration --target-ms 100
+"""
+import argparse
+import sys
+import time
+from typing import List, Optional
+
+from passlib.hash import sha256_crypt
+
+# Giới hạn rounds của sha256_crypt
+MIN_ROUNDS = sha256_crypt.min_rounds
+MAX_ROUNDS = sha256_crypt.max_rounds
+# Số rounds dùng để đo; thời gian verify tỉ lệ tuyến tính với rounds
+SAMPLE_ROUNDS = 50000
+
+
+def measure_verify_seconds(rounds: int, samples: int = 5) -> float:
+    """
+    Thời gian verify nhanh nhất trong các lần đo (ít nhiễu hơn trung bình)
+    """
+    hashed = sha256_crypt.using(rounds=rounds).hash("calibration-password")
+    best = float("inf")
+    for _ in range(samples):
+        started = time.perf_counter()
+        sha256_crypt.verify("calibration-password", hashed)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def calibrate_rounds(target_ms: float, samples: int = 5) -> int:
+    """
+    Số rounds để một lần verify mất khoảng target_ms mili giây, làm tròn tới hàng nghìn
+    """
+    per_round = measure_verify_seconds(SAMPLE_ROUNDS, samples) / SAMPLE_ROUNDS
+    rounds = int(round(target_ms / 1000 / per_round, -3))
+    return max(MIN_ROUNDS, min(MAX_ROUNDS, rounds))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Hiệu chỉnh số rounds hash mật khẩu")
+    parser.add_argument("--target-ms", type=float, required=True, help="Thời gian verify mục tiêu (ms)")
+    parser.add_argument("--samples", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    rounds = calibrate_rounds(args.target_ms, args.samples)
+    measured = measure_verify_seconds(rounds, args.samples) * 1000
+    print(f"PASSWORD_HASH_ROUNDS={rounds}  # verify ~{measured:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Optional, Tuple
+
+from .config import settings
+from .metrics import registry
+from .security import get_password_hash, get_password_rounds, verify_password
+
+HASH_QUEUE_WAIT = registry.histogram(
+    "password_hash_queue_wait_seconds",
+    "Thời gian chờ trong hàng đợi trước khi worker bắt đầu hash",
+    ["operation"],
+)
+HASH_DURATION = registry.histogram(
+    "password_hash_duration_seconds",
+    "Thời gian worker thực hiện hash/verify mật khẩu",
+    ["operation"],
+)
+HASH_REJECTED = registry.counter(
+    "password_hash_rejected_total",
+    "Số yêu cầu hash bị từ chối do hàng đợi đầy",
+    ["operation"],
+)
+HASH_PENDING = registry.gauge(
+    "password_hash_pending",
+    "Số yêu cầu hash đang chạy hoặc đang chờ",
+)
+
+
+class HashingQueueFullError(Exception):
+    """
+    Hàng đợi hash mật khẩu đã đầy
+    """
+
+
+def _timed_call(fn: Callable[..., Any], *args: Any) -> Tuple[float, float, Any]:
+    # time.monotonic dùng chung đồng hồ hệ thống nên so sánh được giữa các tiến trình
+    started = time.monotonic()
+    result = fn(*args)
+    return started, time.monotonic(), result
+
+
+class HashingExecutor:
+    """
+    Chạy hash/verify mật khẩu trong process pool có giới hạn,
+    để các đợt đăng nhập dồn dập không giữ GIL và chặn event loop.
+    """
+
+    def __init__(self, pool_size: int, queue_depth: int):
+        self.pool_size = pool_size
+        self.queue_depth = queue_depth
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Chỉ được truy cập từ event loop nên không cần khóa
+        self._pending = 0
+
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        if self._executor is None and self.pool_size > 0:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.pool_size,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def _run(self, operation: str, fn: Callable[..., Any], *args: Any) -> Any:
+        if self._pending >= max(self.pool_size, 1) + self.queue_depth:
+            HASH_REJECTED.labels(operation).inc()
+            raise HashingQueueFullError("Hàng đợi hash mật khẩu đã đầy")
+
+        self._pending += 1
+        HASH_PENDING.set(self._pending)
+        submitted = time.monotonic()
+        try:
+            executor = self._get_executor()
+            if executor is None:
+                started, finished, result = _timed_call(fn, *args)
+            else:
+                loop = asyncio.get_running_loop()
+                started, finished, result = await loop.run_in_executor(
+                    executor, _timed_call, fn, *args
+                )
+        finally:
+            self._pending -= 1
+            HASH_PENDING.set(self._pending)
+
+        HASH_QUEUE_WAIT.labels(operation).observe(max(started - submitted, 0.0))
+        HASH_DURATION.labels(operation).observe(finished - started)
+        return result
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """
+        Xác thực mật khẩu trong process pool
+        """
+        return await self._run("verify", verify_password, plain_password, hashed_password)
+
+    async def hash(self, password: str) -> str:
+        """
+        Hash mật khẩu trong process pool
+        """
+        return await self._run("hash", get_password_hash, password, get_password_rounds())
+
+    async def warm(self) -> None:
+        """
+        Khởi động sẵn các tiến trình worker (spawn và import module hash) trước request đầu tiên
+        """
+        executor = self._get_executor()
+        if executor is None:
+            return
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[
+            loop.run_in_executor(executor, get_password_rounds) for _ in range(self.pool_size)
+        ])
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+hashing_executor = HashingExecutor(settings.HASH_POOL_SIZE, settings.HASH_QUEUE_DEPTH)
@@ -0,0 +1,157 @@
+import logging
+import time
+from typing import Any, Callable
+
+from starlette.datastructures import MutableHeaders
+
+from ..database.query_stats import QueryBudgetExceededError, start_query_stats, stop_query_stats
+from .config import settings
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+HTTP_REQUESTS = registry.counter(
+    "http_requests_total",
+    "Số request HTTP theo route và status",
+    ["method", "route", "status"],
+)
+HTTP_REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds",
+    "Độ trễ request HTTP theo route (tính đến khi gửi xong body)",
+    ["method", "route"],
+)
+HTTP_IN_FLIGHT = registry.gauge(
+    "http_requests_in_flight",
+    "Số request HTTP đang xử lý",
+    ["method"],
+)
+
+DB_QUERIES_PER_REQUEST = registry.histogram(
+    "db_queries_per_request",
+    "Số truy vấn SQL trong mỗi request",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100),
+)
+DB_TIME_PER_REQUEST = registry.histogram(
+    "db_time_per_request_seconds",
+    "Tổng thời gian thực thi SQL trong mỗi request",
+    ["route"],
+)
+DB_REPEATED_STATEMENTS = registry.counter(
+    "db_repeated_statement_requests_total",
+    "Số request có câu lệnh SQL lặp lại (nghi vấn N+1)",
+    ["route"],
+)
+DB_BUDGET_EXCEEDED = registry.counter(
+    "db_query_budget_exceeded_total",
+    "Số request vượt ngân sách truy vấn của route",
+    ["route"],
+)
+
+# Nhãn cho request không khớp route nào, tránh bùng nổ số nhãn theo đường dẫn thô
+UNMATCHED_ROUTE = "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware ghi số request, status và histogram độ trễ theo route template
+    (ví dụ /api/users/{user_id}), cùng gauge request đang xử lý.
+    Viết ở mức ASGI thuần để chi phí mỗi request chỉ vài micro giây.
+    """
+
+    def __init__(self, app: Callable[..., Any]):
+        self.app = app
+
+    async def __call__(self, scope: dict, receive: Callable[..., Any], send: Callable[..., Any]) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+
+        async def send_wrapper(message: dict) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_flight = HTTP_IN_FLIGHT.labels(method)
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - started
+            in_flight.dec()
+            # Router gán route đã khớp vào scope trong quá trình xử lý
+            template = _route_template(scope)
+            HTTP_REQUESTS.labels(method, template, str(status_code)).inc()
+            HTTP_REQUEST_DURATION.labels(method, template).observe(duration)
+
+
+class QueryAccountingMiddleware:
+    """
+    ASGI middleware đếm số truy vấn SQL và thời gian DB của từng request.
+    Ghi thêm header X-DB-Query-Count/X-DB-Time-Ms (nếu bật), cảnh báo câu lệnh lặp lại (N+1)
+    và kiểm tra ngân sách truy vấn khai báo bằng query_budget.
+    """
+
+    def __init__(self, app: Callable[..., Any]):
+        self.app = app
+
+    async def __call__(self, scope: dict, receive: Callable[..., Any], send: Callable[..., Any]) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats, token = start_query_stats()
+
+        async def send_wrapper(message: dict) -> None:
+            if message["type"] == "http.response.start":
+                if stats.over_budget and settings.SQL_QUERY_BUDGET_STRICT:
+                    raise QueryBudgetExceededError(
+                        f"{scope['method']} {_route_template(scope)}: "
+                        f"{stats.count} truy vấn, ngân sách {stats.budget}"
+                    )
+                if settings.SQL_ACCOUNTING_HEADERS:
+                    headers = MutableHeaders(scope=message)
+                    headers.append("X-DB-Query-Count", str(stats.count))
+                    headers.append("X-DB-Time-Ms", f"{stats.duration * 1000:.2f}")
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            stop_query_stats(token)
+            self._report(scope, stats)
+
+    @staticmethod
+    def _report(scope: dict, stats: Any) -> None:
+        template = _route_template(scope)
+        DB_QUERIES_PER_REQUEST.labels(template).observe(stats.count)
+        DB_TIME_PER_REQUEST.labels(template).observe(stats.duration)
+
+        repeated = stats.repeated(settings.SQL_N_PLUS_ONE_THRESHOLD)
+        if repeated:
+            DB_REPEATED_STATEMENTS.labels(template).inc()
+            for statement, count in repeated:
+                logger.warning(
+                    "Nghi vấn N+1 tại %s %s: câu lệnh lặp %d lần: %s",
+                    scope["method"], template, count, " ".join(statement.split())[:300],
+                )
+        if stats.over_budget:
+            DB_BUDGET_EXCEEDED.labels(template).inc()
+            logger.warning(
+                "%s %s vượt ngân sách truy vấn: %d/%d",
+                scope["method"], template, stats.count, stats.budget,
+            )
+        logger.debug(
+            "%s %s: %d truy vấn, %.2f ms DB",
+            scope["method"], template, stats.count, stats.duration * 1000,
+        )
+
+
+def _route_template(scope: dict) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
@@ -0,0 +1,106 @@
+import math
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from .config import settings
+from .metrics import registry
+
+LOGIN_ATTEMPTS_REJECTED = registry.counter(
+    "login_attempts_rejected_total",
+    "Số lần đăng nhập/xác thực mật khẩu bị chặn do vượt giới hạn",
+    ["scope"],
+)
+
+
+class RateLimitExceededError(Exception):
+    """
+    Vượt giới hạn số lần thử, retry_after là số giây nên chờ
+    """
+
+    def __init__(self, retry_after: float):
+        super().__init__("Vượt giới hạn số lần thử")
+        self.retry_after = retry_after
+
+
+class RateLimitBackend:
+    """
+    Giao diện backend đếm số lần thử (ví dụ Redis để chia sẻ giữa các worker)
+    """
+
+    async def hit(self, key: str, limit: int, window: float) -> float:
+        """
+        Ghi nhận một lần thử; trả về 0 nếu được phép, ngược lại là số giây cần chờ
+        """
+        raise NotImplementedError
+
+
+class LocalRateLimitBackend(RateLimitBackend):
+    """
+    Sliding window counter trong tiến trình: ước lượng số lần thử trong cửa sổ trượt
+    từ bộ đếm của cửa sổ hiện tại và cửa sổ trước, mỗi key chỉ tốn ba số.
+    """
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        # key -> [chỉ số cửa sổ hiện tại, số lần ở cửa sổ trước, số lần ở cửa sổ hiện tại]
+        self._counters: "OrderedDict[str, List[float]]" = OrderedDict()
+
+    async def hit(self, key: str, limit: int, window: float) -> float:
+        now = time.monotonic()
+        current_window = math.floor(now / window)
+        counter = self._counters.get(key)
+        if counter is None:
+            counter = [current_window, 0, 0]
+            self._counters[key] = counter
+            while len(self._counters) > self.max_keys:
+                self._counters.popitem(last=False)
+        else:
+            self._counters.move_to_end(key)
+            if counter[0] != current_window:
+                # Cửa sổ hiện tại cũ trở thành cửa sổ trước (hoặc bỏ nếu đã quá xa)
+                counter[1] = counter[2] if counter[0] == current_window - 1 else 0
+                counter[2] = 0
+                counter[0] = current_window
+
+        elapsed_fraction = now / window - current_window
+        estimated = counter[1] * (1 - elapsed_fraction) + counter[2]
+        if estimated >= limit:
+            return max(window * (1 - elapsed_fraction), 1.0)
+        counter[2] += 1
+        return 0.0
+
+
+class LoginRateLimiter:
+    """
+    Giới hạn số lần thử mật khẩu theo email và theo IP, kiểm tra trước khi chạm tới database hay hasher
+    """
+
+    def __init__(self, backend: RateLimitBackend):
+        self.backend = backend
+
+    async def check(self, email: Optional[str], client_ip: Optional[str]) -> None:
+        window = settings.LOGIN_RATE_LIMIT_WINDOW_SECONDS
+        if window <= 0:
+            return
+        checks: List[Tuple[str, Optional[str], int]] = [
+            ("ip", client_ip, settings.LOGIN_RATE_LIMIT_PER_IP),
+            ("email", email.lower() if email else None, settings.LOGIN_RATE_LIMIT_PER_EMAIL),
+        ]
+        for scope, value, limit in checks:
+            if not value or limit <= 0:
+                continue
+            retry_after = await self.backend.hit(f"login:{scope}:{value}", limit, window)
+            if retry_after:
+                LOGIN_ATTEMPTS_REJECTED.labels(scope).inc()
+                raise RateLimitExceededError(retry_after)
+
+
+login_rate_limiter = LoginRateLimiter(LocalRateLimitBackend())
+
+
+def set_login_rate_limit_backend(backend: RateLimitBackend) -> None:
+    """
+    Thay backend cục bộ bằng backend dùng chung khi chạy nhiều worker
+    """
+    login_rate_limiter.backend = backend
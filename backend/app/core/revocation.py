@@ -0,0 +1,105 @@
+import hashlib
+import math
+from typing import Iterable, Optional, Set
+
+from .config import settings
+from .metrics import registry
+
+REVOCATION_CHECKS = registry.counter(
+    "token_revocation_checks_total",
+    "Số lần kiểm tra thu hồi token theo kết quả",
+    ["result"],
+)
+REVOCATION_ENTRIES = registry.gauge(
+    "token_revocation_entries",
+    "Số jti đang có trong danh sách thu hồi trong bộ nhớ",
+)
+
+# Dung lượng tối thiểu của Bloom filter, tránh dựng lại liên tục khi danh sách còn nhỏ
+MIN_BLOOM_CAPACITY = 1024
+
+
+class BloomFilter:
+    """
+    Bloom filter trên bytearray, dùng double hashing từ một digest blake2b.
+    Trả lời "chắc chắn không có" hoặc "có thể có" với tỉ lệ dương tính giả fp_rate.
+    """
+
+    def __init__(self, capacity: int, fp_rate: float):
+        capacity = max(capacity, 1)
+        self.num_bits = max(8, int(-capacity * math.log(fp_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, value: str) -> Iterable[int]:
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, value: str) -> None:
+        for position in self._positions(value):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class RevocationList:
+    """
+    Danh sách jti bị thu hồi giữ trong bộ nhớ: Bloom filter loại nhanh phần lớn token hợp lệ,
+    tập chính xác xác nhận các trường hợp "có thể có". Được dựng lại định kỳ từ bảng revoked_tokens
+    nên kiểm tra mỗi request không cần truy vấn database.
+    """
+
+    def __init__(self, fp_rate: float):
+        self.fp_rate = fp_rate
+        self._exact: Set[str] = set()
+        # jti thu hồi tại tiến trình này kể từ lần dựng lại trước, giữ lại khi dựng lại
+        # phòng trường hợp truy vấn dựng lại chạy trước khi bản ghi thu hồi được commit
+        self._recent: Set[str] = set()
+        self._capacity = MIN_BLOOM_CAPACITY
+        self._bloom = BloomFilter(self._capacity, fp_rate)
+
+    def __len__(self) -> int:
+        return len(self._exact)
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        if not jti:
+            return False
+        if jti not in self._bloom:
+            REVOCATION_CHECKS.labels("bloom_negative").inc()
+            return False
+        revoked = jti in self._exact
+        REVOCATION_CHECKS.labels("revoked" if revoked else "false_positive").inc()
+        return revoked
+
+    def add(self, jti: str) -> None:
+        """
+        Thêm jti vừa thu hồi ở tiến trình này (các worker khác nhận được ở lần dựng lại kế tiếp)
+        """
+        self._exact.add(jti)
+        self._recent.add(jti)
+        if len(self._exact) > self._capacity:
+            self.replace(list(self._exact))
+        else:
+            self._bloom.add(jti)
+        REVOCATION_ENTRIES.set(len(self._exact))
+
+    def replace(self, jtis: Iterable[str]) -> None:
+        """
+        Thay toàn bộ nội dung bằng danh sách jti mới, kích thước Bloom filter theo số phần tử
+        """
+        exact = set(jtis) | self._recent
+        self._recent = set()
+        # Dư gấp đôi để còn chỗ cho các jti thêm vào trước lần dựng lại kế tiếp
+        capacity = max(MIN_BLOOM_CAPACITY, len(exact) * 2)
+        bloom = BloomFilter(capacity, self.fp_rate)
+        for jti in exact:
+            bloom.add(jti)
+        self._exact, self._bloom, self._capacity = exact, bloom, capacity
+        REVOCATION_ENTRIES.set(len(exact))
+
+
+revocation_list = RevocationList(settings.REVOCATION_BLOOM_FP_RATE)
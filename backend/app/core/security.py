@@ -1,13 +1,36 @@
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Any, Optional, Union
 from jose import jwt
 from passlib.context import CryptContext
 import hashlib
+import time
+import uuid
+from ..core.cache import TTLCache
 from ..core.config import settings
+from ..core.metrics import registry
+from ..schemas.token import TokenPayload
 
 # Sử dụng SHA-256 cho password hashing theo yêu cầu
 pwd_context = CryptContext(schemes=["sha256_crypt"], deprecated="auto")
 
+# Số rounds sha256_crypt đang dùng để hash (None = mặc định của passlib), xem hash_calibration
+_password_rounds: Optional[int] = settings.PASSWORD_HASH_ROUNDS or None
+# Hash có rounds lệch quá khoảng này so với cấu hình sẽ được hash lại khi đăng nhập;
+# khoảng dung sai tránh việc các worker hiệu chỉnh ra số hơi khác nhau hash lại qua lại
+PASSWORD_ROUNDS_TOLERANCE = 0.25
+
+ACCESS_TOKEN_TYPE = "access"
+REFRESH_TOKEN_TYPE = "refresh"
+
+# Cache các token đã xác thực chữ ký, key là digest SHA-256 của token
+verified_token_cache = TTLCache(settings.JWT_CACHE_MAX_SIZE)
+JWT_CACHE_REQUESTS = registry.counter(
+    "jwt_cache_requests_total",
+    "Số lần tra cứu cache JWT đã xác thực",
+    ["result"],
+)
+
 def create_access_token(subject: Union[str, Any], expires_delta: Optional[timedelta] = None) -> str:
     """
     Tạo JWT access token
@@ -17,21 +40,98 @@ def create_access_token(subject: Union[str, Any], expires_delta: Optional[timede
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode = {"exp": expire, "sub": str(subject)}
+    # jti định danh từng token để có thể thu hồi khi đăng xuất
+    to_encode = {"exp": expire, "sub": str(subject), "jti": uuid.uuid4().hex, "type": ACCESS_TOKEN_TYPE}
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
+def create_refresh_token(subject: Union[str, Any], family: Optional[str] = None) -> str:
+    """
+    Tạo JWT refresh token (dùng một lần, được xoay vòng mỗi lần làm mới).
+    Các token xoay vòng từ cùng một lần đăng nhập chung family (claim fam) để thu hồi cả chuỗi;
+    iat dùng để loại token cấp trước lần đổi mật khẩu.
+    """
+    expire = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    to_encode = {
+        "exp": expire,
+        # Lấy cả phần lẻ của giây để phân biệt token cấp ngay trước/sau lần đổi mật khẩu
+        "iat": time.time(),
+        "sub": str(subject),
+        "jti": uuid.uuid4().hex,
+        "fam": family or uuid.uuid4().hex,
+        "type": REFRESH_TOKEN_TYPE,
+    }
+    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+def create_token_pair(subject: Union[str, Any], family: Optional[str] = None) -> dict:
+    """
+    Tạo cặp access token và refresh token cho response đăng nhập (family của refresh token
+    được giữ nguyên khi xoay vòng)
+    """
+    return {
+        "access_token": create_access_token(subject),
+        "refresh_token": create_refresh_token(subject, family),
+        "token_type": "bearer",
+    }
+
+def decode_access_token(token: str) -> TokenPayload:
+    """
+    Giải mã và xác thực JWT (access hoặc refresh, phân biệt bằng claim type), dùng lại kết quả đã xác thực nếu token còn trong cache.
+    Ném JWTError hoặc ValidationError nếu token không hợp lệ.
+    """
+    key = hashlib.sha256(token.encode()).digest()
+    token_data = verified_token_cache.get(key)
+    if token_data is not None:
+        JWT_CACHE_REQUESTS.labels("hit").inc()
+        return token_data
+
+    JWT_CACHE_REQUESTS.labels("miss").inc()
+    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    token_data = TokenPayload(**payload)
+
+    # Entry hết hạn đúng thời điểm exp của token
+    if token_data.exp is not None:
+        verified_token_cache.set(key, token_data, token_data.exp - time.time())
+    return token_data
+
+@lru_cache(maxsize=8)
+def _password_context(rounds: Optional[int]) -> CryptContext:
+    if not rounds:
+        return pwd_context
+    return pwd_context.copy(
+        sha256_crypt__default_rounds=rounds,
+        sha256_crypt__min_rounds=int(rounds * (1 - PASSWORD_ROUNDS_TOLERANCE)),
+        sha256_crypt__max_rounds=int(rounds * (1 + PASSWORD_ROUNDS_TOLERANCE)),
+    )
+
+def get_password_rounds() -> Optional[int]:
+    return _password_rounds
+
+def set_password_rounds(rounds: Optional[int]) -> None:
+    """
+    Đổi số rounds dùng cho các hash mới (ví dụ sau khi hiệu chỉnh lúc khởi động)
+    """
+    global _password_rounds
+    _password_rounds = rounds or None
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     Xác thực mật khẩu
     """
     return pwd_context.verify(plain_password, hashed_password)
 
-def get_password_hash(password: str) -> str:
+def get_password_hash(password: str, rounds: Optional[int] = None) -> str:
+    """
+    Hash mật khẩu; rounds được truyền tường minh vì hàm chạy trong process pool
+    (tiến trình con không thấy giá trị hiệu chỉnh của tiến trình chính)
+    """
+    return _password_context(rounds).hash(password)
+
+def password_needs_rehash(hashed_password: str) -> bool:
     """
-    Hash mật khẩu
+    Hash đã lưu dùng thuật toán cũ hoặc số rounds lệch khỏi cấu hình hiện tại
     """
-    return pwd_context.hash(password)
+    return _password_context(_password_rounds).needs_update(hashed_password)
 
 def hash_sha256(password: str) -> str:
     """
@@ -0,0 +1,38 @@
+from functools import lru_cache
+from typing import Any, Mapping, Optional
+
+from fastapi.responses import Response
+from pydantic import TypeAdapter
+
+from .config import settings
+
+
+class JSONBytesResponse(Response):
+    """
+    Response chứa JSON đã được encode sẵn thành bytes
+    """
+    media_type = "application/json"
+
+
+@lru_cache(maxsize=None)
+def type_adapter(schema: Any) -> TypeAdapter:
+    """
+    TypeAdapter dùng lại cho mỗi schema, tránh dựng lại validator/serializer mỗi request
+    """
+    return TypeAdapter(schema)
+
+
+def fast_response(
+    schema: Any, content: Any, status_code: int = 200, headers: Optional[Mapping[str, str]] = None
+) -> Any:
+    """
+    Khi bật FAST_SERIALIZATION: validate một lần từ ORM rồi encode thẳng ra bytes bằng
+    serializer của pydantic-core, bỏ qua bước validate response_model và jsonable_encoder của FastAPI.
+    Khi tắt: trả nguyên content để FastAPI xử lý theo response_model như cũ
+    (headers khi đó cần được đặt qua tham số Response của endpoint).
+    """
+    if not settings.FAST_SERIALIZATION:
+        return content
+    adapter = type_adapter(schema)
+    value = adapter.validate_python(content, from_attributes=True)
+    return JSONBytesResponse(adapter.dump_json(value), status_code=status_code, headers=headers)
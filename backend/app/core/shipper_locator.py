@@ -0,0 +1,202 @@
+"""
+Vị trí shipper trong bộ nhớ và tìm k shipper gần nhất.
+
+Vị trí được gửi liên tục (PUT /shippers/me/location) nên không ghi database: mỗi lần cập nhật chỉ
+chuyển shipper giữa các ô lưới (SHIPPER_GRID_DEGREES độ). Tìm kiếm duyệt các vòng ô quanh điểm
+cần tìm và dừng khi shipper thứ k đã gần hơn mọi ô chưa duyệt. Vị trí quá SHIPPER_LOCATION_TTL_SECONDS
+không cập nhật coi như shipper đã offline.
+
+Dữ liệu nằm trong từng tiến trình: khi chạy nhiều worker, các endpoint /shippers cần được định tuyến
+về cùng một worker.
+"""
+import heapq
+import math
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .config import settings
+from .geo import METERS_PER_DEGREE, haversine_m
+from .metrics import registry
+
+Cell = Tuple[int, int]
+
+SHIPPER_MATCH_DURATION = registry.histogram(
+    "shipper_match_seconds",
+    "Thời gian tìm k shipper gần nhất trong bộ nhớ",
+    buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01),
+)
+
+
+class ShipperPosition:
+    __slots__ = ("shipper_id", "latitude", "longitude", "updated_at", "cell")
+
+    def __init__(self, shipper_id: int, latitude: float, longitude: float, updated_at: float, cell: Cell):
+        self.shipper_id = shipper_id
+        self.latitude = latitude
+        self.longitude = longitude
+        self.updated_at = updated_at
+        self.cell = cell
+
+
+class ShipperLocator:
+    """
+    Lưới ô vuông chứa vị trí mới nhất của các shipper đang sẵn sàng nhận đơn
+    """
+
+    def __init__(self, cell_degrees: float, ttl_seconds: float):
+        self.cell_degrees = cell_degrees
+        self.ttl_seconds = ttl_seconds
+        self._positions: Dict[int, ShipperPosition] = {}
+        self._cells: Dict[Cell, Set[int]] = {}
+        self._last_purge = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def _cell(self, latitude: float, longitude: float) -> Cell:
+        return math.floor(latitude / self.cell_degrees), math.floor(longitude / self.cell_degrees)
+
+    def _unlink(self, position: ShipperPosition) -> None:
+        members = self._cells.get(position.cell)
+        if members is not None:
+            members.discard(position.shipper_id)
+            if not members:
+                del self._cells[position.cell]
+
+    def update(self, shipper_id: int, latitude: float, longitude: float) -> None:
+        """
+        Ghi vị trí mới của shipper (O(1)); thỉnh thoảng dọn các vị trí đã hết hạn
+        """
+        now = time.monotonic()
+        cell = self._cell(latitude, longitude)
+        position = self._positions.get(shipper_id)
+        if position is None:
+            self._positions[shipper_id] = ShipperPosition(shipper_id, latitude, longitude, now, cell)
+            self._cells.setdefault(cell, set()).add(shipper_id)
+        else:
+            if position.cell != cell:
+                self._unlink(position)
+                self._cells.setdefault(cell, set()).add(shipper_id)
+                position.cell = cell
+            position.latitude = latitude
+            position.longitude = longitude
+            position.updated_at = now
+        if now - self._last_purge >= self.ttl_seconds:
+            self.purge_stale(now)
+
+    def remove(self, shipper_id: int) -> bool:
+        """
+        Bỏ shipper khỏi lưới (offline); trả về False nếu shipper không có trong lưới
+        """
+        position = self._positions.pop(shipper_id, None)
+        if position is None:
+            return False
+        self._unlink(position)
+        return True
+
+    def purge_stale(self, now: Optional[float] = None) -> int:
+        """
+        Xóa các vị trí không được cập nhật trong ttl_seconds, trả về số vị trí đã xóa
+        """
+        now = time.monotonic() if now is None else now
+        self._last_purge = now
+        deadline = now - self.ttl_seconds
+        stale = [position for position in self._positions.values() if position.updated_at < deadline]
+        for position in stale:
+            self.remove(position.shipper_id)
+        return len(stale)
+
+    def _ring(self, row: int, col: int, radius: int, max_row: int, max_col: int) -> Iterator[Cell]:
+        # Vòng ô cách (row, col) đúng radius ô, bỏ các ô lệch quá max_row hàng hoặc max_col cột
+        if radius == 0:
+            yield row, col
+            return
+        if radius <= max_row:
+            span = min(radius, max_col)
+            for dc in range(-span, span + 1):
+                yield row - radius, col + dc
+                yield row + radius, col + dc
+        if radius <= max_col:
+            span = min(radius - 1, max_row)
+            for dr in range(-span, span + 1):
+                yield row + dr, col - radius
+                yield row + dr, col + radius
+
+    def nearest(
+        self, latitude: float, longitude: float, k: int, max_radius_m: float
+    ) -> List[Tuple[ShipperPosition, float]]:
+        """
+        k shipper còn hiệu lực gần (latitude, longitude) nhất trong bán kính max_radius_m,
+        sắp xếp theo khoảng cách haversine (mét). Ứng viên được chọn theo khoảng cách phẳng xấp xỉ,
+        chỉ có thể lệch thứ tự giữa các shipper cách đều nhau trong phạm vi dưới một mét.
+        """
+        started = time.perf_counter()
+        now = time.monotonic()
+        deadline = now - self.ttl_seconds
+        size = self.cell_degrees
+        row, col = self._cell(latitude, longitude)
+        cos_lat = max(math.cos(math.radians(latitude)), 1e-6)
+        # Số hàng và số cột cần duyệt được giới hạn riêng: ô theo kinh độ hẹp dần về phía cực nhưng
+        # không bao giờ cần quá nửa vòng kinh tuyến mỗi bên
+        max_row = math.ceil(max_radius_m / (METERS_PER_DEGREE * size))
+        max_col = min(math.ceil(max_radius_m / (METERS_PER_DEGREE * size * cos_lat)), math.ceil(180 / size))
+
+        # Max-heap (theo -khoảng cách bình phương, xấp xỉ phẳng) giữ k ứng viên gần nhất
+        best: List[Tuple[float, int]] = []
+
+        def collect(cells: Iterable[Cell]) -> None:
+            for cell in cells:
+                members = self._cells.get(cell)
+                if not members:
+                    continue
+                for shipper_id in members:
+                    position = self._positions[shipper_id]
+                    if position.updated_at < deadline:
+                        continue
+                    dlat = position.latitude - latitude
+                    dlng = (position.longitude - longitude) * cos_lat
+                    dist2 = dlat * dlat + dlng * dlng
+                    if len(best) < k:
+                        heapq.heappush(best, (-dist2, shipper_id))
+                    elif dist2 < -best[0][0]:
+                        heapq.heapreplace(best, (-dist2, shipper_id))
+
+        if (2 * max_row + 1) * (2 * max_col + 1) > len(self._positions):
+            # Vùng tìm kiếm có nhiều ô hơn số shipper (gần cực hoặc lưới thưa): duyệt thẳng các ô
+            # đang có shipper thay vì từng ô trống
+            collect([
+                cell for cell in self._cells
+                if abs(cell[0] - row) <= max_row and abs(cell[1] - col) <= max_col
+            ])
+        else:
+            for radius in range(max(max_row, max_col) + 1):
+                collect(self._ring(row, col, radius, max_row, max_col))
+                if len(best) == k:
+                    # Khoảng cách ngắn nhất từ điểm tìm kiếm tới các ô ngoài các vòng đã duyệt
+                    gap = min(
+                        latitude - (row - radius) * size,
+                        (row + radius + 1) * size - latitude,
+                        (longitude - (col - radius) * size) * cos_lat,
+                        ((col + radius + 1) * size - longitude) * cos_lat,
+                    )
+                    if -best[0][0] <= gap * gap:
+                        break
+
+        results = []
+        for _, shipper_id in best:
+            position = self._positions[shipper_id]
+            distance = haversine_m(latitude, longitude, position.latitude, position.longitude)
+            if distance <= max_radius_m:
+                results.append((position, distance))
+        results.sort(key=lambda item: item[1])
+        SHIPPER_MATCH_DURATION.observe(time.perf_counter() - started)
+        return results
+
+
+shipper_locator = ShipperLocator(settings.SHIPPER_GRID_DEGREES, settings.SHIPPER_LOCATION_TTL_SECONDS)
+
+SHIPPERS_TRACKED = registry.gauge(
+    "shipper_locations_tracked",
+    "Số shipper đang có vị trí trong bộ nhớ (kể cả vị trí hết hạn chưa được dọn)",
+    function=lambda: len(shipper_locator),
+)
@@ -0,0 +1,353 @@
+"""
+Vùng giao hàng: đa giác đọc từ file GeoJSON, tra cứu điểm thuộc vùng nào qua lưới ô vuông dựng sẵn.
+
+Mỗi ô lưới (DELIVERY_ZONE_GRID_DEGREES độ) lưu các vùng có thể chứa điểm trong ô. Ô nằm trọn trong
+một vùng (không có cạnh đa giác nào đi qua) trả kết quả ngay; chỉ ô nằm trên biên mới cần kiểm tra
+điểm trong đa giác, và chỉ với các vùng đi qua ô đó. Gán vùng hàng loạt (assign_many) dùng numpy
+nếu có để kiểm tra cả mảng điểm cùng lúc.
+
+File vùng là nguồn chung của mọi worker: mỗi worker kiểm tra mtime của file đã nạp tối đa một lần
+mỗi DELIVERY_ZONE_RELOAD_SECONDS giây và khi file đổi thì nạp lại trong thread riêng. Nên thay file
+bằng cách ghi file tạm rồi đổi tên để worker không đọc phải file đang ghi dở.
+"""
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy không bắt buộc, assign_many quay về tra từng điểm
+    np = None
+
+from .config import settings
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+ZONE_COUNT = registry.gauge(
+    "delivery_zones_loaded",
+    "Số vùng giao hàng đang nạp trong bộ nhớ",
+)
+ZONE_LOOKUPS = registry.counter(
+    "delivery_zone_lookups_total",
+    "Số lần tra vùng giao hàng theo cách trả lời (ô nằm trọn trong vùng, kiểm tra đa giác, không thuộc vùng nào)",
+    ["result"],
+)
+
+# Vòng đa giác: danh sách (lng, lat), điểm cuối không lặp lại điểm đầu
+Ring = List[Tuple[float, float]]
+Cell = Tuple[int, int]
+
+
+class ZoneFormatError(Exception):
+    """
+    File vùng giao hàng không đọc được hoặc sai định dạng GeoJSON
+    """
+
+
+class Zone:
+    """
+    Một vùng giao hàng: các vòng đa giác (kể cả lỗ và các phần của MultiPolygon) và khung bao
+    """
+
+    def __init__(self, zone_id: str, name: Optional[str], rings: List[Ring]):
+        self.id = zone_id
+        self.name = name
+        self.rings = rings
+        lngs = [lng for ring in rings for lng, _ in ring]
+        lats = [lat for ring in rings for _, lat in ring]
+        self.bbox = (min(lats), max(lats), min(lngs), max(lngs))
+
+    def contains(self, latitude: float, longitude: float) -> bool:
+        """
+        Ray casting chẵn-lẻ trên mọi vòng: điểm trong lỗ hoặc ngoài mọi phần đều cho False
+        """
+        inside = False
+        for ring in self.rings:
+            lng_j, lat_j = ring[-1]
+            for lng_i, lat_i in ring:
+                if (lat_i > latitude) != (lat_j > latitude) and longitude < (
+                    (lng_j - lng_i) * (latitude - lat_i) / (lat_j - lat_i) + lng_i
+                ):
+                    inside = not inside
+                lng_j, lat_j = lng_i, lat_i
+        return inside
+
+    def contains_many(self, latitudes: Any, longitudes: Any) -> Any:
+        """
+        Phiên bản numpy của contains cho cả mảng điểm (cần numpy)
+        """
+        inside = np.zeros(latitudes.shape, dtype=bool)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for ring in self.rings:
+                coords = np.asarray(ring, dtype=np.float64)
+                lng_i, lat_i = coords[:, 0], coords[:, 1]
+                lng_j, lat_j = np.roll(lng_i, 1), np.roll(lat_i, 1)
+                for k in range(len(coords)):
+                    crosses = (lat_i[k] > latitudes) != (lat_j[k] > latitudes)
+                    x = (lng_j[k] - lng_i[k]) * (latitudes - lat_i[k]) / (lat_j[k] - lat_i[k]) + lng_i[k]
+                    inside ^= crosses & (longitudes < x)
+        return inside
+
+
+class ZoneIndex:
+    """
+    Lưới ô vuông trên các vùng giao hàng. Vùng khai báo trước được ưu tiên khi các vùng chồng nhau.
+    """
+
+    def __init__(self, zones: Sequence[Zone], cell_degrees: float):
+        self.zones = list(zones)
+        self.cell_degrees = cell_degrees
+        # Ô -> danh sách (vùng, cần kiểm tra đa giác hay không) theo thứ tự ưu tiên
+        self._grid: Dict[Cell, List[Tuple[Zone, bool]]] = {}
+        for zone in self.zones:
+            self._index_zone(zone)
+
+    def __len__(self) -> int:
+        return len(self.zones)
+
+    @property
+    def cell_count(self) -> int:
+        return len(self._grid)
+
+    def _cell(self, latitude: float, longitude: float) -> Cell:
+        return math.floor(latitude / self.cell_degrees), math.floor(longitude / self.cell_degrees)
+
+    def _cells_in(self, lat_min: float, lat_max: float, lng_min: float, lng_max: float) -> Iterable[Cell]:
+        row_min, col_min = self._cell(lat_min, lng_min)
+        row_max, col_max = self._cell(lat_max, lng_max)
+        for row in range(row_min, row_max + 1):
+            for col in range(col_min, col_max + 1):
+                yield row, col
+
+    def _index_zone(self, zone: Zone) -> None:
+        # Ô chạm khung bao của một cạnh được coi là ô biên (thừa một chút nhưng không bao giờ sót)
+        boundary = set()
+        for ring in zone.rings:
+            lng_j, lat_j = ring[-1]
+            for lng_i, lat_i in ring:
+                boundary.update(self._cells_in(
+                    min(lat_i, lat_j), max(lat_i, lat_j), min(lng_i, lng_j), max(lng_i, lng_j)
+                ))
+                lng_j, lat_j = lng_i, lat_i
+
+        half = self.cell_degrees / 2
+        for cell in self._cells_in(*zone.bbox):
+            if cell in boundary:
+                self._grid.setdefault(cell, []).append((zone, True))
+                continue
+            # Không cạnh nào đi qua ô: cả ô cùng trong hoặc cùng ngoài vùng, kiểm tra tâm ô là đủ
+            row, col = cell
+            if zone.contains(row * self.cell_degrees + half, col * self.cell_degrees + half):
+                self._grid.setdefault(cell, []).append((zone, False))
+
+    def lookup(self, latitude: float, longitude: float) -> Optional[Zone]:
+        """
+        Vùng chứa điểm (latitude, longitude), None nếu điểm không thuộc vùng nào
+        """
+        for zone, needs_test in self._grid.get(self._cell(latitude, longitude), ()):
+            if not needs_test:
+                ZONE_LOOKUPS.labels("cell").inc()
+                return zone
+            if zone.contains(latitude, longitude):
+                ZONE_LOOKUPS.labels("polygon").inc()
+                return zone
+        ZONE_LOOKUPS.labels("none").inc()
+        return None
+
+    def assign_many(
+        self, latitudes: Sequence[Optional[float]], longitudes: Sequence[Optional[float]]
+    ) -> List[Optional[str]]:
+        """
+        zone_id cho cả loạt điểm (None khi thiếu tọa độ hoặc ngoài mọi vùng).
+        Với numpy: lọc theo khung bao rồi kiểm tra đa giác trên cả mảng, mỗi vùng một lượt.
+        """
+        if np is None:
+            return [
+                self.zone_id_at(latitude, longitude)
+                for latitude, longitude in zip(latitudes, longitudes)
+            ]
+
+        lats = np.array([np.nan if value is None else value for value in latitudes], dtype=np.float64)
+        lngs = np.array([np.nan if value is None else value for value in longitudes], dtype=np.float64)
+        result: List[Optional[str]] = [None] * len(lats)
+        pending = ~(np.isnan(lats) | np.isnan(lngs))
+        for zone in self.zones:
+            lat_min, lat_max, lng_min, lng_max = zone.bbox
+            candidates = np.flatnonzero(
+                pending & (lats >= lat_min) & (lats <= lat_max) & (lngs >= lng_min) & (lngs <= lng_max)
+            )
+            if not len(candidates):
+                continue
+            matched = candidates[zone.contains_many(lats[candidates], lngs[candidates])]
+            for position in matched.tolist():
+                result[position] = zone.id
+            pending[matched] = False
+        return result
+
+    def zone_id_at(self, latitude: Optional[float], longitude: Optional[float]) -> Optional[str]:
+        """
+        zone_id của điểm, None khi thiếu tọa độ hoặc ngoài mọi vùng
+        """
+        if latitude is None or longitude is None:
+            return None
+        zone = self.lookup(float(latitude), float(longitude))
+        return zone.id if zone is not None else None
+
+
+def _rings_from_geometry(geometry: Dict[str, Any]) -> List[Ring]:
+    geometry_type = geometry.get("type")
+    if geometry_type == "Polygon":
+        polygons = [geometry["coordinates"]]
+    elif geometry_type == "MultiPolygon":
+        polygons = geometry["coordinates"]
+    else:
+        raise ZoneFormatError(f"Kiểu hình học không hỗ trợ: {geometry_type}")
+    rings = []
+    for polygon in polygons:
+        for ring in polygon:
+            points = [(float(point[0]), float(point[1])) for point in ring]
+            if len(points) > 1 and points[0] == points[-1]:
+                points.pop()
+            if len(points) < 3:
+                raise ZoneFormatError("Vòng đa giác cần ít nhất 3 điểm")
+            rings.append(points)
+    return rings
+
+
+def parse_zones(data: Dict[str, Any]) -> List[Zone]:
+    """
+    Đọc các vùng từ GeoJSON FeatureCollection; zone_id lấy từ properties.zone_id, properties.id
+    hoặc id của feature, tên lấy từ properties.name
+    """
+    if data.get("type") != "FeatureCollection":
+        raise ZoneFormatError("Cần GeoJSON FeatureCollection")
+    zones = []
+    seen = set()
+    for feature in data.get("features", []):
+        properties = feature.get("properties") or {}
+        zone_id = properties.get("zone_id", properties.get("id", feature.get("id")))
+        if zone_id is None:
+            raise ZoneFormatError("Feature thiếu zone_id")
+        zone_id = str(zone_id)
+        if zone_id in seen:
+            raise ZoneFormatError(f"zone_id bị trùng: {zone_id}")
+        seen.add(zone_id)
+        zones.append(Zone(zone_id, properties.get("name"), _rings_from_geometry(feature.get("geometry") or {})))
+    return zones
+
+
+def _file_version(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _read_zone_index(path: str) -> Tuple[ZoneIndex, Optional[int]]:
+    # Lấy mtime trước khi đọc: file đổi trong lúc đọc sẽ được nạp lại ở lần kiểm tra sau
+    version = _file_version(path) if path else None
+    zones: List[Zone] = []
+    if path:
+        try:
+            with open(path, encoding="utf-8") as file:
+                zones = parse_zones(json.load(file))
+        except (OSError, ValueError, KeyError, TypeError, IndexError) as exc:
+            raise ZoneFormatError(f"Không đọc được file vùng giao hàng {path}: {exc}") from exc
+    return ZoneIndex(zones, settings.DELIVERY_ZONE_GRID_DEGREES), version
+
+
+def _install_zone_index(index: ZoneIndex, path: str, version: Optional[int]) -> ZoneIndex:
+    global _zone_index, _zone_path, _zone_version, _last_version_check
+    _zone_index = index
+    _zone_path, _zone_version = path, version
+    _last_version_check = time.monotonic()
+    ZONE_COUNT.set(len(index))
+    logger.info("Đã nạp %d vùng giao hàng (%d ô lưới)", len(index), index.cell_count)
+    return index
+
+
+def load_zone_index(path: Optional[str] = None) -> ZoneIndex:
+    """
+    Đọc file GeoJSON (mặc định DELIVERY_ZONES_PATH), dựng ZoneIndex và dùng nó cho các lần tra sau.
+    Không cấu hình đường dẫn nghĩa là không có vùng nào.
+    """
+    path = settings.DELIVERY_ZONES_PATH if path is None else path
+    index, version = _read_zone_index(path)
+    return _install_zone_index(index, path, version)
+
+
+_zone_index: Optional[ZoneIndex] = None
+# File đã nạp và mtime của nó lúc nạp, dùng để phát hiện file vùng được thay ở worker khác
+_zone_path = ""
+_zone_version: Optional[int] = None
+_last_version_check = 0.0
+_reload_task: Optional["asyncio.Task[None]"] = None
+
+
+def _reload_failed(version: Optional[int]) -> None:
+    global _zone_version
+    # Giữ chỉ mục cũ; chỉ thử lại khi file đổi tiếp
+    _zone_version = version
+    logger.exception("File vùng giao hàng đã đổi nhưng không nạp được, giữ các vùng cũ")
+
+
+async def _reload_in_background(path: str, version: int) -> None:
+    try:
+        index, loaded_version = await asyncio.to_thread(_read_zone_index, path)
+    except ZoneFormatError:
+        _reload_failed(version)
+        return
+    # Bỏ kết quả nếu trong lúc đọc đã có lần nạp khác (ví dụ POST /zones/reassign)
+    if path == _zone_path and loaded_version != _zone_version:
+        _install_zone_index(index, path, loaded_version)
+
+
+def _reload_if_changed() -> None:
+    global _last_version_check, _reload_task
+    _last_version_check = time.monotonic()
+    if _reload_task is not None and not _reload_task.done():
+        return
+    version = _file_version(_zone_path)
+    if version is None or version == _zone_version:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # Ngoài event loop (chạy tay từ dòng lệnh): nạp ngay
+        try:
+            load_zone_index(_zone_path)
+        except ZoneFormatError:
+            _reload_failed(version)
+        return
+    # Đọc file và dựng lưới trong thread riêng để không chặn event loop; các request trong lúc đó
+    # vẫn dùng chỉ mục cũ, chỉ mục mới được thay vào một lần khi đã dựng xong
+    _reload_task = loop.create_task(_reload_in_background(_zone_path, version))
+
+
+def get_zone_index() -> ZoneIndex:
+    """
+    ZoneIndex hiện tại; được nạp khi khởi động, lần gọi đầu tự nạp nếu chưa có.
+    Khi file vùng đã đổi (kiểm tra mtime tối đa mỗi DELIVERY_ZONE_RELOAD_SECONDS giây), file được nạp
+    lại ở nền và lần gọi này vẫn trả về chỉ mục cũ.
+    """
+    if _zone_index is None:
+        return load_zone_index()
+    if (
+        _zone_path
+        and settings.DELIVERY_ZONE_RELOAD_SECONDS > 0
+        and time.monotonic() - _last_version_check >= settings.DELIVERY_ZONE_RELOAD_SECONDS
+    ):
+        _reload_if_changed()
+    return _zone_index
+
+
+def address_zone(latitude: Optional[float], longitude: Optional[float]) -> Optional[str]:
+    """
+    zone_id lưu cho một địa chỉ, None nếu địa chỉ chưa có tọa độ hoặc nằm ngoài mọi vùng
+    """
+    return get_zone_index().zone_id_at(latitude, longitude)
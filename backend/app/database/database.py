@@ -1,19 +1,163 @@
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Optional, Union
+
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 
 from ..core.config import settings
+from .pool import (
+    InstrumentedAsyncQueuePool,
+    InstrumentedQueuePool,
+    configure_pool_telemetry,
+    pool_options,
+)
+from .query_stats import install_query_hooks
 
 SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
+SQLALCHEMY_ASYNC_DATABASE_URL = settings.ASYNC_DATABASE_URL
+
+# Engine và session factory được tạo khi dùng lần đầu (hoặc trong lifespan của create_app),
+# import module không mở pool hay nạp driver
+_ENGINE_ATTRIBUTES = ("engine", "SessionLocal", "async_engine", "AsyncSessionLocal")
+_engines_ready = False
+
+
+def init_engines() -> None:
+    """
+    Tạo engine đồng bộ, engine bất đồng bộ (khi bật DB_ASYNC) và session factory; gọi nhiều lần không sao
+    """
+    global engine, SessionLocal, async_engine, AsyncSessionLocal, _engines_ready
+    if _engines_ready:
+        return
+
+    engine = create_engine(SQLALCHEMY_DATABASE_URL, poolclass=InstrumentedQueuePool, **pool_options())
+    configure_pool_telemetry(engine, "primary_sync" if settings.DB_ASYNC else "primary")
+    install_query_hooks(engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    # Engine bất đồng bộ chỉ được tạo khi bật DB_ASYNC (cần driver asyncpg)
+    async_engine = (
+        create_async_engine(
+            SQLALCHEMY_ASYNC_DATABASE_URL, poolclass=InstrumentedAsyncQueuePool, **pool_options()
+        )
+        if settings.DB_ASYNC
+        else None
+    )
+    if async_engine is not None:
+        configure_pool_telemetry(async_engine.sync_engine, "primary")
+        install_query_hooks(async_engine.sync_engine)
+    AsyncSessionLocal = (
+        async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+        if async_engine is not None
+        else None
+    )
+    _engines_ready = True
+
+
+def __getattr__(name: str) -> Any:
+    if name in _ENGINE_ATTRIBUTES:
+        init_engines()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
-    try:
+
+class _SyncStreamResult:
+    """
+    Phiên bản awaitable tối thiểu của AsyncResult cho kết quả stream đồng bộ
+    """
+
+    def __init__(self, result: Any):
+        self._result = result
+
+    async def partitions(self, size: Optional[int] = None) -> AsyncIterator[Any]:
+        for partition in self._result.partitions(size):
+            yield partition
+
+    async def close(self) -> None:
+        self._result.close()
+
+
+class SyncSessionAdapter:
+    """
+    Bọc Session đồng bộ với cùng giao diện awaitable như AsyncSession,
+    để các endpoint/service chỉ cần một phiên bản code cho cả hai chế độ.
+    Các truy vấn vẫn chạy trực tiếp (chặn event loop) như cách cũ.
+    """
+
+    def __init__(self, session: Session):
+        self.sync_session = session
+
+    def add(self, instance: Any) -> None:
+        self.sync_session.add(instance)
+
+    def add_all(self, instances: Any) -> None:
+        self.sync_session.add_all(instances)
+
+    async def execute(self, statement: Any, params: Optional[Any] = None, **kwargs: Any) -> Any:
+        return self.sync_session.execute(statement, params, **kwargs)
+
+    async def scalar(self, statement: Any, params: Optional[Any] = None, **kwargs: Any) -> Any:
+        return self.sync_session.scalar(statement, params, **kwargs)
+
+    async def scalars(self, statement: Any, params: Optional[Any] = None, **kwargs: Any) -> Any:
+        return self.sync_session.scalars(statement, params, **kwargs)
+
+    async def stream(self, statement: Any, params: Optional[Any] = None, **kwargs: Any) -> _SyncStreamResult:
+        result = self.sync_session.execute(
+            statement.execution_options(stream_results=True), params, **kwargs
+        )
+        return _SyncStreamResult(result)
+
+    async def get(self, entity: Any, ident: Any, **kwargs: Any) -> Any:
+        return self.sync_session.get(entity, ident, **kwargs)
+
+    async def flush(self) -> None:
+        self.sync_session.flush()
+
+    async def commit(self) -> None:
+        self.sync_session.commit()
+
+    async def rollback(self) -> None:
+        self.sync_session.rollback()
+
+    async def refresh(self, instance: Any, attribute_names: Optional[Any] = None) -> None:
+        self.sync_session.refresh(instance, attribute_names)
+
+    async def delete(self, instance: Any) -> None:
+        self.sync_session.delete(instance)
+
+    async def close(self) -> None:
+        self.sync_session.close()
+
+    async def connection(self) -> Any:
+        return self.sync_session.connection()
+
+
+DBSession = Union[AsyncSession, SyncSessionAdapter]
+
+
+@asynccontextmanager
+async def session_scope() -> AsyncIterator[DBSession]:
+    """
+    Mở một session theo chế độ cấu hình (DB_ASYNC) và đóng lại khi kết thúc
+    """
+    init_engines()
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as session:
+            yield session
+    else:
+        session = SessionLocal()
+        try:
+            yield SyncSessionAdapter(session)
+        finally:
+            session.close()
+
+
+async def get_db() -> AsyncIterator[DBSession]:
+    async with session_scope() as db:
         yield db
-    finally:
-        db.close() 
\ No newline at end of file
@@ -0,0 +1,135 @@
+import time
+from typing import Any, Callable, Dict, Tuple
+
+from sqlalchemy import event
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from ..core.config import settings
+from ..core.metrics import registry
+
+POOL_CHECKOUT_WAIT = registry.histogram(
+    "db_pool_checkout_wait_seconds",
+    "Thời gian chờ lấy kết nối từ pool",
+    ["pool"],
+)
+POOL_TIMEOUTS = registry.counter(
+    "db_pool_timeouts_total",
+    "Số lần chờ kết nối quá DB_POOL_TIMEOUT",
+    ["pool"],
+)
+POOL_CONNECTS = registry.counter(
+    "db_pool_connects_total",
+    "Số kết nối DBAPI mới được mở",
+    ["pool"],
+)
+
+# Các engine đã gắn telemetry, theo nhãn
+_engines: Dict[str, Engine] = {}
+
+
+def _read_pools(read: Callable[[QueuePool], int]) -> Callable[[], Dict[Tuple[str, ...], float]]:
+    # Đọc trạng thái pool lúc thu thập metric: event checkin chạy trước khi pool trả kết nối
+    # nên giá trị cập nhật trong event luôn lệch một kết nối
+    return lambda: {
+        (label,): read(engine.pool)
+        for label, engine in _engines.items()
+        if isinstance(engine.pool, QueuePool)
+    }
+
+
+POOL_CHECKED_OUT = registry.gauge(
+    "db_pool_checked_out",
+    "Số kết nối đang được sử dụng",
+    ["pool"],
+    function=_read_pools(lambda pool: pool.checkedout()),
+)
+POOL_OVERFLOW = registry.gauge(
+    "db_pool_overflow",
+    "Số kết nối đang mở vượt quá pool_size",
+    ["pool"],
+    function=_read_pools(lambda pool: max(pool.overflow(), 0)),
+)
+
+
+def pool_options() -> Dict[str, Any]:
+    """
+    Tham số pool lấy từ settings. Tổng kết nối tối đa của một worker là
+    DB_POOL_SIZE + DB_MAX_OVERFLOW, nhân với số worker phải nhỏ hơn max_connections của PostgreSQL.
+    """
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+class _InstrumentedPoolMixin:
+    """
+    Đo thời gian chờ lấy kết nối và số lần timeout của QueuePool
+    """
+    _telemetry_label = "primary"
+
+    def _do_get(self) -> Any:
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except sa_exc.TimeoutError:
+            POOL_TIMEOUTS.labels(self._telemetry_label).inc()
+            raise
+        finally:
+            POOL_CHECKOUT_WAIT.labels(self._telemetry_label).observe(time.perf_counter() - started)
+
+    def recreate(self) -> Any:
+        pool = super().recreate()
+        pool._telemetry_label = self._telemetry_label
+        return pool
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def configure_pool_telemetry(engine: Engine, label: str) -> None:
+    """
+    Gắn nhãn và các event pool cho engine (với AsyncEngine truyền vào engine.sync_engine)
+    """
+    engine.pool._telemetry_label = label
+    _engines[label] = engine
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection: Any, connection_record: Any) -> None:
+        POOL_CONNECTS.labels(label).inc()
+
+
+def pool_status() -> Dict[str, Any]:
+    """
+    Trạng thái hiện tại của các pool để so sánh với max_connections khi chạy tải
+    """
+    status = {}
+    for label, engine in _engines.items():
+        pool = engine.pool
+        entry: Dict[str, Any] = {
+            "status": pool.status(),
+            "timeouts": POOL_TIMEOUTS.labels(label).value,
+            "checkout_wait_seconds": POOL_CHECKOUT_WAIT.labels(label).summary(),
+            # Số câu lệnh đã biên dịch đang giữ trong cache của engine (giới hạn query_cache_size)
+            "compiled_cache_size": len(engine._compiled_cache) if engine._compiled_cache is not None else 0,
+        }
+        if isinstance(pool, QueuePool):
+            entry.update(
+                size=pool.size(),
+                checked_in=pool.checkedin(),
+                checked_out=pool.checkedout(),
+                overflow=max(pool.overflow(), 0),
+                max_overflow=pool._max_overflow,
+            )
+        status[label] = entry
+    return status
@@ -0,0 +1,78 @@
+"""
+Các câu lệnh select() dùng nhiều nhất, dựng một lần khi import với bindparam.
+
+Dùng lại cùng một đối tượng statement giúp bỏ qua chi phí dựng statement và tính cache key
+mỗi lần gọi; SQL đã biên dịch nằm trong compiled cache của engine (theo dõi bằng metric
+db_compiled_cache_total). Câu lệnh UPDATE không đặt ở đây vì synchronize_session="evaluate"
+không đọc được giá trị bindparam, đối tượng đã load trong session sẽ không được đồng bộ.
+
+Ví dụ: await db.scalar(USER_BY_ID, {"user_id": 1})
+"""
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import bindparam, func, select
+from sqlalchemy.orm import joinedload
+
+from ..models.address import Address
+from ..models.user import User
+
+USER_BY_ID = select(User).where(User.id == bindparam("user_id")).limit(1)
+
+# So khớp không phân biệt hoa thường, dùng index ux_users_email_lower
+USER_BY_EMAIL = (
+    select(User)
+    .where(func.lower(User.email) == func.lower(bindparam("email")))
+    .limit(1)
+)
+
+# User kèm địa chỉ (GET /users/me, GET /users/{user_id}); cần .unique() trên kết quả
+USER_WITH_ADDRESSES = (
+    select(User)
+    .options(joinedload(User.addresses))
+    .where(User.id == bindparam("user_id"))
+)
+
+ADDRESSES_BY_USER = select(Address).where(Address.user_id == bindparam("user_id"))
+
+ADDRESS_FOR_USER = (
+    select(Address)
+    .where(Address.id == bindparam("address_id"), Address.user_id == bindparam("user_id"))
+    .limit(1)
+)
+
+DEFAULT_ADDRESS_FOR_USER = (
+    select(Address)
+    .where(Address.user_id == bindparam("user_id"), Address.is_default == True)
+    .limit(1)
+)
+
+# Phiên bản hồ sơ và danh sách địa chỉ cho ETag (xem services/version_service.py)
+PROFILE_VERSION = (
+    select(
+        User.updated_at,
+        func.count(Address.id),
+        func.max(Address.id),
+        func.max(Address.updated_at),
+    )
+    .outerjoin(Address, Address.user_id == User.id)
+    .where(User.id == bindparam("user_id"))
+    .group_by(User.id, User.updated_at)
+)
+
+ADDRESSES_VERSION = select(
+    func.count(Address.id),
+    func.max(Address.id),
+    func.max(Address.updated_at),
+).where(Address.user_id == bindparam("user_id"))
+
+# Tham số không khớp dòng nào, dùng để chạy trước các câu lệnh lúc khởi động
+HOT_QUERIES: List[Tuple[Any, Dict[str, Any]]] = [
+    (USER_BY_ID, {"user_id": 0}),
+    (USER_BY_EMAIL, {"email": ""}),
+    (USER_WITH_ADDRESSES, {"user_id": 0}),
+    (ADDRESSES_BY_USER, {"user_id": 0}),
+    (ADDRESS_FOR_USER, {"address_id": 0, "user_id": 0}),
+    (DEFAULT_ADDRESS_FOR_USER, {"user_id": 0}),
+    (PROFILE_VERSION, {"user_id": 0}),
+    (ADDRESSES_VERSION, {"user_id": 0}),
+]
@@ -0,0 +1,124 @@
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.default import CacheStats
+
+from ..core.metrics import registry
+
+COMPILED_CACHE = registry.counter(
+    "db_compiled_cache_total",
+    "Số câu lệnh thực thi theo kết quả tra compiled cache của SQLAlchemy",
+    ["result"],
+)
+_CACHE_RESULT_LABELS = {
+    CacheStats.CACHE_HIT: "hit",
+    CacheStats.CACHE_MISS: "miss",
+    CacheStats.CACHING_DISABLED: "disabled",
+    CacheStats.NO_CACHE_KEY: "no_key",
+    CacheStats.NO_DIALECT_SUPPORT: "unsupported",
+}
+
+
+def compiled_cache_hit_ratio() -> float:
+    """
+    Tỉ lệ câu lệnh dùng lại SQL đã biên dịch (trên các câu lệnh có thể cache)
+    """
+    hits = COMPILED_CACHE.labels("hit").value
+    misses = COMPILED_CACHE.labels("miss").value
+    return hits / (hits + misses) if hits + misses else 0.0
+
+
+COMPILED_CACHE_HIT_RATIO = registry.gauge(
+    "db_compiled_cache_hit_ratio",
+    "Tỉ lệ hit của compiled cache kể từ khi khởi động",
+    function=compiled_cache_hit_ratio,
+)
+
+
+class QueryBudgetExceededError(Exception):
+    """
+    Route chạy nhiều truy vấn hơn ngân sách cho phép (chỉ ném ở chế độ strict)
+    """
+
+
+class QueryStats:
+    """
+    Thống kê truy vấn SQL của một request
+    """
+    __slots__ = ("count", "duration", "statements", "budget")
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements: Dict[str, int] = {}
+        self.budget: Optional[int] = None
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.duration += duration
+        self.statements[statement] = self.statements.get(statement, 0) + 1
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """
+        Các câu lệnh giống hệt nhau lặp lại từ threshold lần trở lên (dấu hiệu N+1)
+        """
+        return [(statement, count) for statement, count in self.statements.items() if count >= threshold]
+
+    @property
+    def over_budget(self) -> bool:
+        return self.budget is not None and self.count > self.budget
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+
+def start_query_stats() -> Tuple[QueryStats, Any]:
+    """
+    Bắt đầu đếm truy vấn cho ngữ cảnh hiện tại, trả về (stats, token) để reset sau đó
+    """
+    stats = QueryStats()
+    return stats, _current_stats.set(stats)
+
+
+def stop_query_stats(token: Any) -> None:
+    _current_stats.reset(token)
+
+
+def query_budget(max_queries: int) -> Callable[[], Any]:
+    """
+    Dependency khai báo số truy vấn tối đa của một route, ví dụ:
+    @router.get("/me", dependencies=[Depends(query_budget(2))])
+    """
+    async def _set_query_budget() -> None:
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.budget = max_queries
+    return _set_query_budget
+
+
+def install_query_hooks(engine: Engine) -> None:
+    """
+    Gắn event đếm số truy vấn và thời gian DB vào engine (với AsyncEngine truyền vào engine.sync_engine)
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(
+        conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool
+    ) -> None:
+        context._query_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(
+        conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool
+    ) -> None:
+        COMPILED_CACHE.labels(_CACHE_RESULT_LABELS.get(context.cache_hit, "no_key")).inc()
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.record(statement, time.perf_counter() - context._query_started)
@@ -0,0 +1,292 @@
+import itertools
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, List, Optional, Tuple
+
+from fastapi import Depends, Request
+from jose import JWTError
+from pydantic import ValidationError
+from sqlalchemy import create_engine, event
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from ..core.cache import CacheBackend, LocalCacheBackend
+from ..core.config import settings
+from ..core.metrics import registry
+from ..core.security import decode_access_token
+from .database import DBSession, SyncSessionAdapter, get_db, session_scope
+from .pool import (
+    InstrumentedAsyncQueuePool,
+    InstrumentedQueuePool,
+    configure_pool_telemetry,
+    pool_options,
+)
+from .query_stats import install_query_hooks
+
+logger = logging.getLogger(__name__)
+
+READ_ROUTING = registry.counter(
+    "db_read_routing_total",
+    "Số session đọc theo đích (replica, primary khi không có replica, read-your-writes hoặc fallback)",
+    ["target"],
+)
+REPLICA_HEALTHY = registry.gauge(
+    "db_replica_healthy",
+    "Replica đang được chọn (1) hay tạm loại do lỗi kết nối (0)",
+    ["replica"],
+)
+
+
+class Replica:
+    """
+    Một read replica: engine, session factory và trạng thái sức khỏe
+    """
+
+    def __init__(self, label: str, session_factory: Callable[[], DBSession], engine: Any):
+        self.label = label
+        self.session_factory = session_factory
+        self.engine = engine
+        # Thời điểm (monotonic) replica được chọn lại sau khi bị đánh dấu lỗi
+        self.retry_at = 0.0
+        REPLICA_HEALTHY.labels(label).set(1)
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.retry_at
+
+    def mark_unhealthy(self) -> None:
+        if self.healthy:
+            logger.warning("Replica %s lỗi kết nối, tạm loại trong %ds", self.label, settings.REPLICA_RETRY_SECONDS)
+        self.retry_at = time.monotonic() + settings.REPLICA_RETRY_SECONDS
+        REPLICA_HEALTHY.labels(self.label).set(0)
+
+
+class ReplicaSet:
+    """
+    Chọn replica theo vòng tròn, bỏ qua replica đang bị tạm loại.
+    Engine của các replica được tạo khi dùng lần đầu.
+    """
+
+    def __init__(self, factory: Callable[[], List[Replica]]):
+        self._factory = factory
+        self._replicas: Optional[List[Replica]] = None
+        self._counter = itertools.count()
+
+    @property
+    def replicas(self) -> List[Replica]:
+        if self._replicas is None:
+            self._replicas = self._factory()
+        return self._replicas
+
+    def __bool__(self) -> bool:
+        return bool(self.replicas)
+
+    def candidates(self) -> List[Replica]:
+        """
+        Thứ tự thử các replica cho một session: bắt đầu từ replica kế tiếp trong vòng,
+        replica đang lỗi chỉ được thử khi đã hết thời gian tạm loại
+        """
+        if not self.replicas:
+            return []
+        start = next(self._counter) % len(self.replicas)
+        ordered = self.replicas[start:] + self.replicas[:start]
+        return [replica for replica in ordered if replica.healthy]
+
+
+def _split_urls(value: str) -> List[str]:
+    return [url.strip() for url in value.split(",") if url.strip()]
+
+
+def _watch_disconnects(replica: Replica, engine: Any) -> None:
+    @event.listens_for(engine, "handle_error")
+    def _on_error(context: Any) -> None:
+        if context.is_disconnect:
+            replica.mark_unhealthy()
+
+
+def _create_replicas() -> List[Replica]:
+    replicas = []
+    if settings.DB_ASYNC:
+        for index, url in enumerate(_split_urls(settings.ASYNC_READ_REPLICA_URLS)):
+            engine = create_async_engine(url, poolclass=InstrumentedAsyncQueuePool, **pool_options())
+            factory = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+            replicas.append(Replica(f"replica{index}", factory, engine.sync_engine))
+    else:
+        for index, url in enumerate(_split_urls(settings.READ_REPLICA_URLS)):
+            engine = create_engine(url, poolclass=InstrumentedQueuePool, **pool_options())
+            factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+            replicas.append(Replica(f"replica{index}", lambda f=factory: SyncSessionAdapter(f()), engine))
+    for replica in replicas:
+        configure_pool_telemetry(replica.engine, replica.label)
+        install_query_hooks(replica.engine)
+        _watch_disconnects(replica, replica.engine)
+    return replicas
+
+
+replica_set = ReplicaSet(_create_replicas)
+
+
+class RecentWriters:
+    """
+    ID các user vừa có dữ liệu thay đổi, hết hạn sau READ_YOUR_WRITES_SECONDS.
+    Backend mặc định nằm trong tiến trình; khi chạy nhiều worker cần backend dùng chung
+    (set_recent_writers_backend) để request kế tiếp của user ở worker khác cũng đọc từ primary.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: int):
+        self.backend = backend
+        self.ttl = ttl
+
+    @staticmethod
+    def _key(user_id: int) -> str:
+        return f"recent_writer:{user_id}"
+
+    async def mark(self, user_id: int) -> None:
+        await self.backend.set(self._key(user_id), True, self.ttl)
+
+    async def contains(self, user_id: int) -> bool:
+        return await self.backend.get(self._key(user_id)) is not None
+
+
+recent_writers = RecentWriters(
+    LocalCacheBackend(settings.PRINCIPAL_CACHE_MAX_SIZE),
+    settings.READ_YOUR_WRITES_SECONDS,
+)
+
+
+def set_recent_writers_backend(backend: CacheBackend) -> None:
+    """
+    Thay backend cục bộ bằng cache dùng chung (ví dụ Redis) khi chạy nhiều worker
+    """
+    recent_writers.backend = backend
+
+
+def request_principal(request: Request) -> Optional[int]:
+    """
+    ID user trong access token của request (token đã xác thực được cache nên gần như không tốn gì)
+    """
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        token_data = decode_access_token(token)
+        return int(token_data.sub) if token_data.sub is not None else None
+    except (JWTError, ValidationError, ValueError):
+        return None
+
+
+async def mark_recent_writer(*user_ids: int) -> None:
+    """
+    Gọi sau khi commit thay đổi dữ liệu của các user này (không phải của người gửi request):
+    các lần đọc tiếp theo của họ đi về primary trong READ_YOUR_WRITES_SECONDS giây
+    """
+    if not replica_set or recent_writers.ttl <= 0:
+        return
+    for user_id in user_ids:
+        await recent_writers.mark(user_id)
+
+
+async def _open_replica_session(replica: Replica) -> Optional[DBSession]:
+    session = replica.session_factory()
+    try:
+        # Gọi ở truy vấn đầu tiên: lấy kết nối để phát hiện replica hỏng trước khi chạy truy vấn
+        await session.connection()
+    except (sa_exc.DBAPIError, OSError):
+        replica.mark_unhealthy()
+        await session.close()
+        return None
+    REPLICA_HEALTHY.labels(replica.label).set(1)
+    return session
+
+
+async def _route_read(user_id: Optional[int]) -> Tuple[str, Optional[DBSession]]:
+    """
+    Chọn đích cho session đọc; trả về nhãn đích và session replica (None nghĩa là dùng primary)
+    """
+    if user_id is not None and await recent_writers.contains(user_id):
+        return "primary_read_your_writes", None
+    for replica in replica_set.candidates():
+        session = await _open_replica_session(replica)
+        if session is not None:
+            return replica.label, session
+    return "primary_fallback", None
+
+
+class ReadSession:
+    """
+    Session đọc chỉ chọn đích (replica hoặc primary) ở truy vấn đầu tiên: request không truy vấn
+    (ví dụ principal lấy từ cache) thì không lấy kết nối replica nào.
+    """
+
+    def __init__(self, user_id: Optional[int], primary: DBSession):
+        self.user_id = user_id
+        self.primary = primary
+        self._session: Optional[DBSession] = None
+        self._replica_session: Optional[DBSession] = None
+
+    async def _target(self) -> DBSession:
+        if self._session is None:
+            target, self._replica_session = await _route_read(self.user_id)
+            READ_ROUTING.labels(target).inc()
+            self._session = self._replica_session or self.primary
+        return self._session
+
+    async def execute(self, statement: Any, params: Optional[Any] = None, **kwargs: Any) -> Any:
+        return await (await self._target()).execute(statement, params, **kwargs)
+
+    async def scalar(self, statement: Any, params: Optional[Any] = None, **kwargs: Any) -> Any:
+        return await (await self._target()).scalar(statement, params, **kwargs)
+
+    async def scalars(self, statement: Any, params: Optional[Any] = None, **kwargs: Any) -> Any:
+        return await (await self._target()).scalars(statement, params, **kwargs)
+
+    async def stream(self, statement: Any, params: Optional[Any] = None, **kwargs: Any) -> Any:
+        return await (await self._target()).stream(statement, params, **kwargs)
+
+    async def get(self, entity: Any, ident: Any, **kwargs: Any) -> Any:
+        return await (await self._target()).get(entity, ident, **kwargs)
+
+    async def connection(self) -> Any:
+        return await (await self._target()).connection()
+
+    async def close(self) -> None:
+        # Session primary thuộc về request, chỉ đóng session replica đã mở
+        if self._replica_session is not None:
+            await self._replica_session.close()
+        self._session = self._replica_session = None
+
+
+@asynccontextmanager
+async def read_session_scope(
+    user_id: Optional[int] = None, primary: Optional[DBSession] = None
+) -> AsyncIterator[DBSession]:
+    """
+    Session chỉ đọc: replica nếu có, ngược lại là primary. Không truyền primary thì mở session
+    primary riêng (ví dụ export ngoài request); session chỉ lấy kết nối khi truy vấn.
+    """
+    if primary is None:
+        async with session_scope() as db:
+            async with read_session_scope(user_id, db) as session:
+                yield session
+        return
+    if not replica_set:
+        READ_ROUTING.labels("primary").inc()
+        yield primary
+        return
+    session = ReadSession(user_id, primary)
+    try:
+        yield session
+    finally:
+        await session.close()
+
+
+async def get_read_db(request: Request, db: DBSession = Depends(get_db)) -> AsyncIterator[DBSession]:
+    """
+    Dependency cho endpoint chỉ đọc; endpoint có ghi dữ liệu vẫn dùng get_db (primary).
+    Khi không dùng replica, trả về chính session primary của request.
+    """
+    user_id = request_principal(request) if replica_set else None
+    async with read_session_scope(user_id, db) as session:
+        yield session
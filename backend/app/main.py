@@ -1,22 +1,111 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict
+
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 from .api.api import api_router
+from .core.change_feed import start_change_feed, stop_change_feed
 from .core.config import settings
+from .core.hash_calibration import calibrate_rounds
+from .core.hashing import HashingQueueFullError, hashing_executor
+from .core.middleware import MetricsMiddleware, QueryAccountingMiddleware
+from .core.rate_limit import RateLimitExceededError
+from .core.security import set_password_rounds
+from .services.token_service import run_revocation_refresher
+from .services.warmup import run_warmup, timed_phase
+
+logger = logging.getLogger(__name__)
+
 
-app = FastAPI(title=settings.PROJECT_NAME)
+async def hashing_queue_full_handler(request: Request, exc: HashingQueueFullError):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Hệ thống đang quá tải, vui lòng thử lại sau"},
+        headers={"Retry-After": "1"},
+    )
 
-# CORS configuration
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=settings.BACKEND_CORS_ORIGINS,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+async def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceededError):
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content={"detail": "Quá nhiều lần thử, vui lòng thử lại sau"},
+        headers={"Retry-After": str(math.ceil(exc.retry_after))},
+    )
 
-app.include_router(api_router, prefix=settings.API_V1_STR)
+def calibrate_password_hashing() -> None:
+    if settings.PASSWORD_HASH_TARGET_MS > 0:
+        rounds = calibrate_rounds(settings.PASSWORD_HASH_TARGET_MS)
+        set_password_rounds(rounds)
+        logger.info(
+            "Hiệu chỉnh hash mật khẩu: %d rounds cho mục tiêu %d ms",
+            rounds, settings.PASSWORD_HASH_TARGET_MS,
+        )
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """
+    Làm nóng worker trước khi nhận request (uvicorn chỉ báo sẵn sàng khi bước này xong)
+    và dọn tài nguyên khi tắt
+    """
+    started = time.perf_counter()
+    report: Dict[str, Any] = {}
+    with timed_phase(report, "hash_calibration"):
+        calibrate_password_hashing()
+    await run_warmup(report)
+    with timed_phase(report, "change_feed"):
+        await start_change_feed()
+    refresher = asyncio.create_task(run_revocation_refresher())
+    report["total_seconds"] = round(time.perf_counter() - started, 4)
+    app.state.startup_report = report
+    logger.info("Worker sẵn sàng sau %.3fs: %s", report["total_seconds"], report)
+    try:
+        yield
+    finally:
+        refresher.cancel()
+        await stop_change_feed()
+        hashing_executor.shutdown()
 
-@app.get("/")
 def read_root():
     return {"message": f"Welcome to {settings.PROJECT_NAME}!"}
+
+def create_app() -> FastAPI:
+    """
+    Dựng ứng dụng FastAPI; engine, pool và serializer được khởi tạo trong lifespan.
+    Chạy bằng: uvicorn --factory app.main:create_app (hoặc app.main:app như trước)
+    """
+    app = FastAPI(title=settings.PROJECT_NAME, lifespan=lifespan)
+
+    # CORS configuration
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.BACKEND_CORS_ORIGINS,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    app.add_middleware(QueryAccountingMiddleware)
+
+    # Thêm sau cùng để bao ngoài cùng, đo cả thời gian của các middleware khác
+    app.add_middleware(MetricsMiddleware)
+
+    app.include_router(api_router, prefix=settings.API_V1_STR)
+
+    app.add_exception_handler(HashingQueueFullError, hashing_queue_full_handler)
+    app.add_exception_handler(RateLimitExceededError, rate_limit_exceeded_handler)
+
+    app.add_api_route("/", read_root, methods=["GET"])
+    return app
+
+def __getattr__(name: str) -> Any:
+    # Giữ tương thích với "app.main:app": chỉ dựng app khi được truy cập lần đầu
+    if name == "app":
+        app = create_app()
+        globals()["app"] = app
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,17 +1,26 @@
-from sqlalchemy import Boolean, Column, Integer, String, DateTime, Text, Float, ForeignKey, Numeric
+from sqlalchemy import Boolean, Column, Integer, String, DateTime, Text, Float, ForeignKey, Numeric, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from ..database.database import Base
 
 class Address(Base):
     __tablename__ = "addresses"
+    __table_args__ = (
+        # Tìm theo tiền tố geohash (LIKE 'abc%') cần pattern_ops trên PostgreSQL
+        Index("ix_addresses_geohash", "geohash", postgresql_ops={"geohash": "varchar_pattern_ops"}),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     address_name = Column(String(50))
     address = Column(Text, nullable=False)
-    latitude = Column(Numeric(10, 8))
-    longitude = Column(Numeric(11, 8))
+    # asdecimal=False: trả về float ngay từ driver, không phải chuyển Decimal khi serialize
+    latitude = Column(Numeric(10, 8, asdecimal=False))
+    longitude = Column(Numeric(11, 8, asdecimal=False))
+    # Geohash của (latitude, longitude), đồng bộ khi tạo/cập nhật địa chỉ
+    geohash = Column(String(12))
+    # Vùng giao hàng chứa (latitude, longitude), gán khi tạo/cập nhật và bởi job gán lại vùng
+    zone_id = Column(String(64), index=True)
     is_default = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
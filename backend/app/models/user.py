@@ -1,10 +1,22 @@
-from sqlalchemy import Boolean, Column, Integer, String, DateTime
+from sqlalchemy import Boolean, Column, Integer, String, DateTime, Index, DDL, event
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from ..database.database import Base
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Phục vụ phân trang keyset theo (created_at, id)
+        Index("ix_users_created_at_id", "created_at", "id"),
+        # Tìm kiếm ILIKE '%...%' cho admin (services/user_search.py): GIN trigram trên PostgreSQL
+        *(
+            Index(
+                f"ix_users_{column}_trgm", column,
+                postgresql_using="gin", postgresql_ops={column: "gin_trgm_ops"},
+            ).ddl_if(dialect="postgresql")
+            for column in ("username", "email", "full_name", "phone_number")
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String, unique=True, index=True)
@@ -16,10 +28,23 @@ class User(Base):
     role = Column(String, default="customer")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    # Refresh token cấp trước thời điểm này (ví dụ trước lần đổi mật khẩu gần nhất) không còn dùng được
+    tokens_valid_after = Column(DateTime(timezone=True), nullable=True)
     
     # Relationship với Address
     addresses = relationship("Address", back_populates="user", cascade="all, delete-orphan")
     
     @property
     def is_admin(self):
-        return self.role == "admin" 
\ No newline at end of file
+        return self.role == "admin"
+
+
+# Email không phân biệt hoa thường: vừa chặn trùng "A@x.vn"/"a@x.vn" vừa phục vụ tra cứu lower(email)
+Index("ux_users_email_lower", func.lower(User.email), unique=True)
+
+# gin_trgm_ops cần extension pg_trgm, tạo trước bảng users
+event.listen(
+    User.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
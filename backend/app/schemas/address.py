@@ -22,8 +22,49 @@ class AddressUpdate(BaseModel):
 class Address(AddressBase):
     id: int
     user_id: int
+    zone_id: Optional[str] = None
     created_at: datetime
     updated_at: datetime
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True
+
+class AddressNearby(Address):
+    """
+    Schema cho địa chỉ tìm được theo vị trí, kèm khoảng cách (mét)
+    """
+    distance_m: float
+
+class AddressImportError(BaseModel):
+    line: int
+    error: str
+
+class AddressImportResult(BaseModel):
+    """
+    Kết quả import địa chỉ hàng loạt
+    """
+    inserted: int
+    failed: int
+    errors: List[AddressImportError] = []
+
+class Zone(BaseModel):
+    """
+    Vùng giao hàng (bbox: lat_min, lat_max, lng_min, lng_max)
+    """
+    id: str
+    name: Optional[str] = None
+    bbox: List[float]
+
+class ZoneLookup(BaseModel):
+    zone_id: Optional[str] = None
+
+class ZoneReassignResult(BaseModel):
+    """
+    Kết quả job gán lại vùng giao hàng cho toàn bộ địa chỉ
+    """
+    status: str
+    zones: int
+    scanned: int = 0
+    updated: int = 0
+    seconds: Optional[float] = None
+    error: Optional[str] = None
@@ -0,0 +1,19 @@
+from pydantic import BaseModel, Field
+
+class ShipperLocationUpdate(BaseModel):
+    """
+    Vị trí hiện tại của shipper; available=False để ngừng nhận đơn (xóa khỏi danh sách tìm kiếm)
+    """
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
+    available: bool = True
+
+class NearbyShipper(BaseModel):
+    """
+    Shipper gần một địa chỉ, kèm khoảng cách (mét) và tuổi của vị trí (giây)
+    """
+    shipper_id: int
+    latitude: float
+    longitude: float
+    distance_m: float
+    location_age_seconds: float
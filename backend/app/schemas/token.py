@@ -7,12 +7,26 @@ class Token(BaseModel):
     Schema cho JWT token
     """
     access_token: str
+    refresh_token: Optional[str] = None
     token_type: str = "bearer"
 
 
+class TokenRefresh(BaseModel):
+    """
+    Schema cho yêu cầu làm mới/thu hồi refresh token
+    """
+    refresh_token: str
+
+
 class TokenPayload(BaseModel):
     """
     Schema cho JWT payload
     """
     sub: Optional[str] = None
-    exp: Optional[int] = None 
\ No newline at end of file
+    exp: Optional[int] = None
+    iat: Optional[float] = None
+    jti: Optional[str] = None
+    # Family của refresh token (chuỗi token xoay vòng từ cùng một lần đăng nhập)
+    fam: Optional[str] = None
+    # Token cũ không có claim type được coi là access token
+    type: Optional[str] = None 
\ No newline at end of file
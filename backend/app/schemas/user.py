@@ -50,4 +50,19 @@ class User(UserBase):
         return self.role == "admin"
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True
+
+class UserPage(BaseModel):
+    """
+    Schema cho một trang danh sách user phân trang theo cursor
+    """
+    items: List[User]
+    next_cursor: Optional[str] = None
+
+
+class UserSearchResult(BaseModel):
+    """
+    Schema cho kết quả tìm kiếm user (admin); total_estimate chỉ có khi yêu cầu with_total
+    """
+    items: List[User]
+    total_estimate: Optional[int] = None
@@ -0,0 +1,191 @@
+import csv
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import insert, update
+
+from ..core.config import settings
+from ..core.geo import address_geohash
+from ..core.zones import get_zone_index
+from ..database.database import DBSession
+from ..models.address import Address
+from ..schemas.address import AddressCreate
+
+# Giới hạn độ dài một bản ghi để bộ nhớ không tăng theo dữ liệu xấu
+MAX_RECORD_BYTES = 64 * 1024
+# Số lỗi chi tiết tối đa trả về (tổng số lỗi vẫn được đếm đầy đủ)
+MAX_REPORTED_ERRORS = 100
+
+
+class ImportFormatError(Exception):
+    """
+    Dữ liệu import không đọc tiếp được từ dòng line (sai định dạng ở mức luồng, không phải ở mức từng dòng)
+    """
+
+    def __init__(self, message: str, line: int):
+        super().__init__(message)
+        self.line = line
+
+
+def _decode_line(data: bytes, line_no: int) -> str:
+    try:
+        line = data.decode("utf-8")
+    except UnicodeDecodeError:
+        raise ImportFormatError("Dữ liệu không phải UTF-8", line_no)
+    # Bỏ BOM ở đầu file (Excel thường thêm vào file CSV)
+    return line[1:] if line_no == 1 and line.startswith("\ufeff") else line
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """
+    Tách luồng byte thành từng dòng (giữ ký tự xuống dòng) mà không đọc toàn bộ vào bộ nhớ.
+    Tách theo byte trước khi giải mã (byte xuống dòng không xuất hiện bên trong ký tự UTF-8 nhiều byte)
+    nên lỗi mã hóa được báo đúng dòng.
+    """
+    buffer = b""
+    line_no = 0
+    async for chunk in chunks:
+        buffer += chunk
+        start = 0
+        while True:
+            end = buffer.find(b"\n", start)
+            if end == -1:
+                break
+            line_no += 1
+            if end + 1 - start > MAX_RECORD_BYTES:
+                raise ImportFormatError("Dòng dữ liệu quá dài", line_no)
+            yield _decode_line(buffer[start:end + 1], line_no)
+            start = end + 1
+        buffer = buffer[start:]
+        if len(buffer) > MAX_RECORD_BYTES:
+            raise ImportFormatError("Dòng dữ liệu quá dài", line_no + 1)
+    if buffer:
+        yield _decode_line(buffer, line_no + 1)
+
+
+async def _iter_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Any]]:
+    line_no = 0
+    async for line in _iter_lines(chunks):
+        line_no += 1
+        if not line.strip():
+            continue
+        try:
+            yield line_no, json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield line_no, ValueError(f"JSON không hợp lệ: {exc.msg}")
+
+
+async def _iter_csv(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Any]]:
+    header: Optional[List[str]] = None
+    record = ""
+    line_no = 0
+    record_line = 0
+    async for line in _iter_lines(chunks):
+        line_no += 1
+        if not record:
+            record_line = line_no
+        record += line
+        # Bản ghi chưa kết thúc nếu còn dấu nháy mở (xuống dòng nằm trong ô được quote)
+        if record.count('"') % 2:
+            if len(record) > MAX_RECORD_BYTES:
+                raise ImportFormatError("Bản ghi CSV quá dài hoặc thiếu dấu nháy đóng", record_line)
+            continue
+        current, record = record, ""
+        if not current.strip():
+            continue
+        values = next(csv.reader([current]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if len(values) != len(header):
+            yield record_line, ValueError("Số cột không khớp với dòng tiêu đề")
+            continue
+        # Ô trống được hiểu là không có giá trị
+        yield record_line, {name: value for name, value in zip(header, values) if value != ""}
+    if record.strip():
+        yield record_line, ValueError("Bản ghi CSV thiếu dấu nháy đóng")
+
+
+async def _flush_batch(db: DBSession, user_id: int, batch: List[AddressCreate]) -> None:
+    # Chỉ địa chỉ mặc định cuối cùng trong batch được giữ là mặc định
+    default_index = None
+    for index, address in enumerate(batch):
+        if address.is_default:
+            default_index = index
+
+    if default_index is not None:
+        await db.execute(
+            update(Address).where(
+                Address.user_id == user_id,
+                Address.is_default == True
+            ).values(is_default=False)
+        )
+
+    zone_ids = get_zone_index().assign_many(
+        [address.latitude for address in batch], [address.longitude for address in batch]
+    )
+    rows = [
+        {
+            "user_id": user_id,
+            "address_name": address.address_name,
+            "address": address.address,
+            "latitude": address.latitude,
+            "longitude": address.longitude,
+            "geohash": address_geohash(address.latitude, address.longitude),
+            "zone_id": zone_id,
+            "is_default": index == default_index,
+        }
+        for index, (address, zone_id) in enumerate(zip(batch, zone_ids))
+    ]
+    await db.execute(insert(Address).values(rows))
+    await db.commit()
+
+
+async def import_addresses(
+    db: DBSession, user_id: int, chunks: AsyncIterator[bytes], file_format: str
+) -> Dict[str, Any]:
+    """
+    Import địa chỉ từ luồng NDJSON/CSV cho một user.
+
+    Dữ liệu được đọc dần, mỗi batch ADDRESS_IMPORT_BATCH_SIZE dòng hợp lệ được ghi bằng
+    một câu lệnh INSERT nhiều dòng và commit riêng. Dòng lỗi được bỏ qua và báo lại theo số dòng.
+    Lỗi ở mức luồng (ImportFormatError) dừng việc đọc và được báo như lỗi của dòng đó; các dòng
+    hợp lệ trước đó vẫn được ghi, kết quả luôn cho biết số dòng đã ghi.
+    """
+    records = _iter_csv(chunks) if file_format == "csv" else _iter_ndjson(chunks)
+    batch: List[AddressCreate] = []
+    inserted = 0
+    failed = 0
+    errors: List[Dict[str, Any]] = []
+
+    def record_error(line: int, message: str) -> None:
+        nonlocal failed
+        failed += 1
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append({"line": line, "error": message})
+
+    try:
+        async for line_no, record in records:
+            try:
+                if isinstance(record, Exception):
+                    raise record
+                batch.append(AddressCreate.model_validate(record))
+            except (ValueError, ValidationError) as exc:
+                record_error(line_no, exc.errors()[0]["msg"] if isinstance(exc, ValidationError) else str(exc))
+                continue
+
+            if len(batch) >= settings.ADDRESS_IMPORT_BATCH_SIZE:
+                await _flush_batch(db, user_id, batch)
+                inserted += len(batch)
+                batch = []
+    except ImportFormatError as exc:
+        # Lỗi làm dừng import luôn được báo, kể cả khi đã đủ MAX_REPORTED_ERRORS lỗi
+        failed += 1
+        errors.append({"line": exc.line, "error": str(exc)})
+
+    if batch:
+        await _flush_batch(db, user_id, batch)
+        inserted += len(batch)
+
+    return {"inserted": inserted, "failed": failed, "errors": errors}
@@ -0,0 +1,97 @@
+import math
+from typing import Any, List, Tuple
+
+from sqlalchemy import Float, cast, or_, select
+
+from ..core.geo import (
+    METERS_PER_DEGREE,
+    bounding_box,
+    geohash_encode,
+    geohash_neighbors,
+    haversine_m,
+    precision_for_radius,
+)
+from ..database.database import DBSession
+from ..models.address import Address
+
+# Bán kính tìm kiếm tối đa (mét): vùng lớn hơn ở khu đông dân có quá nhiều ứng viên để đạt vài ms
+MAX_SEARCH_RADIUS_M = 20000.0
+# Bán kính khởi đầu và tối đa (mét) khi mở rộng tìm kiếm địa chỉ gần nhất
+NEAREST_INITIAL_RADIUS_M = 500.0
+NEAREST_MAX_RADIUS_M = MAX_SEARCH_RADIUS_M
+# Lấy dư ứng viên (theo khoảng cách xấp xỉ) so với limit, bù cho sai lệch thứ tự với haversine
+CANDIDATE_FACTOR = 2
+# Nới bán kính lọc trong SQL để không loại nhầm điểm sát biên do khoảng cách xấp xỉ
+APPROX_RADIUS_SLACK = 1.01
+
+# Chỉ các cột trả về cho client (schema Address), không dựng đối tượng ORM
+NEARBY_COLUMNS = (
+    Address.id,
+    Address.user_id,
+    Address.address_name,
+    Address.address,
+    Address.latitude,
+    Address.longitude,
+    Address.zone_id,
+    Address.is_default,
+    Address.created_at,
+    Address.updated_at,
+)
+
+
+async def find_addresses_within(
+    db: DBSession, latitude: float, longitude: float, radius_m: float, limit: int
+) -> List[Tuple[Any, float]]:
+    """
+    Tìm các địa chỉ trong bán kính radius_m quanh một điểm, sắp xếp theo khoảng cách.
+
+    Ứng viên được lọc bằng index geohash (ô trung tâm + 8 ô lân cận) và khung tọa độ, database
+    sắp xếp theo khoảng cách phẳng xấp xỉ và chỉ trả về limit x CANDIDATE_FACTOR dòng gần nhất,
+    sau đó mới tính khoảng cách haversine chính xác. Kết quả là các Row chỉ gồm NEARBY_COLUMNS.
+    """
+    precision = precision_for_radius(latitude, radius_m)
+    cells = geohash_neighbors(geohash_encode(latitude, longitude, precision))
+    lat_min, lat_max, lng_min, lng_max = bounding_box(latitude, longitude, radius_m)
+
+    # Khoảng cách bình phương (đơn vị độ vĩ) theo phép chiếu phẳng quanh điểm tìm kiếm
+    cos_lat = max(math.cos(math.radians(latitude)), 1e-6)
+    dlat = cast(Address.latitude, Float) - latitude
+    dlng = (cast(Address.longitude, Float) - longitude) * cos_lat
+    approx_distance2 = dlat * dlat + dlng * dlng
+    max_distance2 = (radius_m * APPROX_RADIUS_SLACK / METERS_PER_DEGREE) ** 2
+
+    conditions = [
+        or_(*[Address.geohash.like(f"{cell}%") for cell in cells]),
+        Address.latitude.between(lat_min, lat_max),
+    ]
+    query = select(*NEARBY_COLUMNS)
+    # Khung tọa độ vắt qua kinh tuyến 180 (hiếm): bỏ lọc kinh độ và không sắp xếp xấp xỉ trong SQL
+    # (phép chiếu phẳng sai khi vòng qua kinh tuyến), lọc toàn bộ ứng viên bằng haversine như cũ
+    if lng_min >= -180.0 and lng_max <= 180.0:
+        conditions.append(Address.longitude.between(lng_min, lng_max))
+        conditions.append(approx_distance2 <= max_distance2)
+        query = query.order_by(approx_distance2).limit(limit * CANDIDATE_FACTOR)
+    candidates = (await db.execute(query.where(*conditions))).all()
+
+    results = []
+    for address in candidates:
+        distance = haversine_m(latitude, longitude, float(address.latitude), float(address.longitude))
+        if distance <= radius_m:
+            results.append((address, distance))
+    results.sort(key=lambda item: item[1])
+    return results[:limit]
+
+
+async def find_nearest_addresses(
+    db: DBSession, latitude: float, longitude: float, k: int
+) -> List[Tuple[Any, float]]:
+    """
+    Tìm k địa chỉ gần một điểm nhất bằng cách mở rộng dần bán kính tìm kiếm.
+    Khi đã đủ k kết quả trong bán kính r thì mọi địa chỉ bên ngoài đều xa hơn, nên kết quả là chính xác.
+    """
+    radius_m = NEAREST_INITIAL_RADIUS_M
+    while True:
+        results = await find_addresses_within(db, latitude, longitude, radius_m, k)
+        if len(results) >= k or radius_m >= NEAREST_MAX_RADIUS_M:
+            return results
+        radius_m = min(radius_m * 4, NEAREST_MAX_RADIUS_M)
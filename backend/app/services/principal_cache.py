@@ -0,0 +1,75 @@
+from typing import Optional
+
+from ..core.cache import CacheBackend, LocalCacheBackend
+from ..core.config import settings
+from ..core.metrics import registry
+from ..models.user import User
+
+PRINCIPAL_CACHE_REQUESTS = registry.counter(
+    "principal_cache_requests_total",
+    "Số lần tra cứu cache user đã xác thực",
+    ["result"],
+)
+
+# Các cột được cache; không lưu hashed_password ra ngoài database
+PRINCIPAL_FIELDS = (
+    "id",
+    "username",
+    "email",
+    "full_name",
+    "phone_number",
+    "is_active",
+    "role",
+    "created_at",
+    "updated_at",
+)
+
+
+class PrincipalCache:
+    """
+    Cache user theo ID cho get_current_user.
+    User trả về là bản sao tách khỏi session, chỉ dùng để đọc (không add/commit lại).
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: int):
+        self.backend = backend
+        self.ttl = ttl
+
+    @staticmethod
+    def _key(user_id: int) -> str:
+        return f"principal:{user_id}"
+
+    async def get(self, user_id: int) -> Optional[User]:
+        if self.ttl <= 0:
+            return None
+        data = await self.backend.get(self._key(user_id))
+        if data is None:
+            PRINCIPAL_CACHE_REQUESTS.labels("miss").inc()
+            return None
+        PRINCIPAL_CACHE_REQUESTS.labels("hit").inc()
+        return User(**data)
+
+    async def set(self, user: User) -> None:
+        if self.ttl <= 0:
+            return
+        data = {field: getattr(user, field) for field in PRINCIPAL_FIELDS}
+        await self.backend.set(self._key(user.id), data, self.ttl)
+
+    async def invalidate(self, user_id: int) -> None:
+        """
+        Xóa user khỏi cache sau khi thông tin của user thay đổi
+        """
+        await self.backend.delete(self._key(user_id))
+
+
+principal_cache = PrincipalCache(
+    LocalCacheBackend(settings.PRINCIPAL_CACHE_MAX_SIZE),
+    settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
+
+
+def set_principal_cache_backend(backend: CacheBackend) -> None:
+    """
+    Thay backend cục bộ bằng cache dùng chung (ví dụ Redis) khi chạy nhiều worker
+    """
+    principal_cache.backend = backend
@@ -0,0 +1,170 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from jose import JWTError
+from pydantic import ValidationError
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+
+from ..core.config import settings
+from ..core.revocation import revocation_list
+from ..core.security import (
+    ACCESS_TOKEN_TYPE,
+    REFRESH_TOKEN_TYPE,
+    create_token_pair,
+    decode_access_token,
+)
+from ..database.database import DBSession, session_scope
+from ..models.revoked_token import RevokedToken
+from ..models.user import User
+from ..schemas.token import TokenPayload
+from .user_service import get_user_by_id
+
+logger = logging.getLogger(__name__)
+
+
+REFRESH_FAMILY_TYPE = "refresh_family"
+# Family được lưu chung bảng/danh sách thu hồi với jti nên có tiền tố riêng: family của token cũ
+# (chưa có claim fam) chính là jti của nó, không được trùng với bản ghi thu hồi của jti đó
+REFRESH_FAMILY_PREFIX = "fam:"
+
+
+def _family_key(family: str) -> str:
+    return REFRESH_FAMILY_PREFIX + family
+
+
+async def _record_revocation(
+    db: DBSession, jti: str, user_id: int, token_type: str, expires_at: datetime
+) -> bool:
+    db.add(RevokedToken(jti=jti, user_id=user_id, token_type=token_type, expires_at=expires_at))
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        return False
+    revocation_list.add(jti)
+    return True
+
+
+async def revoke_token(db: DBSession, token_data: TokenPayload) -> bool:
+    """
+    Ghi jti của token vào bảng revoked_tokens và danh sách thu hồi trong bộ nhớ.
+    Trả về False nếu token đã bị thu hồi trước đó.
+    """
+    if not token_data.jti or token_data.exp is None:
+        return False
+    return await _record_revocation(
+        db,
+        token_data.jti,
+        int(token_data.sub),
+        token_data.type or ACCESS_TOKEN_TYPE,
+        datetime.fromtimestamp(token_data.exp, timezone.utc),
+    )
+
+
+async def revoke_refresh_family(db: DBSession, user_id: int, family: str) -> bool:
+    """
+    Thu hồi mọi refresh token của một family. Token mới nhất trong family được cấp trước thời điểm này
+    nên hết hạn chậm nhất sau REFRESH_TOKEN_EXPIRE_DAYS; sau đó bản ghi không cần giữ nữa.
+    """
+    expires_at = datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    return await _record_revocation(db, _family_key(family), user_id, REFRESH_FAMILY_TYPE, expires_at)
+
+
+def _issued_before_reset(user: User, token_data: TokenPayload) -> bool:
+    if user.tokens_valid_after is None:
+        return False
+    valid_after = user.tokens_valid_after
+    if valid_after.tzinfo is None:
+        valid_after = valid_after.replace(tzinfo=timezone.utc)
+    # Token không có iat (cấp trước khi có claim này) coi như cấp trước mọi lần đổi mật khẩu
+    return token_data.iat is None or token_data.iat < valid_after.timestamp()
+
+
+async def rotate_refresh_token(db: DBSession, refresh_token: str) -> Optional[dict]:
+    """
+    Đổi refresh token lấy cặp token mới mà không cần xác thực mật khẩu.
+    Refresh token cũ bị thu hồi ngay (khóa chính jti đảm bảo mỗi token chỉ dùng được một lần);
+    dùng lại một token đã thu hồi sẽ thu hồi cả family của nó (token có thể đã bị đánh cắp).
+    Trả về None nếu token không hợp lệ, đã dùng, cấp trước lần đổi mật khẩu gần nhất
+    hoặc user không còn hoạt động.
+    """
+    try:
+        token_data = decode_access_token(refresh_token)
+    except (JWTError, ValidationError):
+        return None
+    if token_data.type != REFRESH_TOKEN_TYPE or not token_data.jti or token_data.sub is None:
+        return None
+    user_id = int(token_data.sub)
+    # Token cấp trước khi có claim fam: dùng jti làm family cho các token xoay vòng từ nó
+    family = token_data.fam or token_data.jti
+    if revocation_list.is_revoked(_family_key(family)):
+        return None
+    if revocation_list.is_revoked(token_data.jti):
+        await _revoke_reused_family(db, user_id, family, token_data.jti)
+        return None
+
+    user = await get_user_by_id(db, user_id)
+    if not user or not user.is_active or _issued_before_reset(user, token_data):
+        return None
+
+    if not await revoke_token(db, token_data):
+        # Token đã được dùng ở worker khác (chưa kịp vào danh sách thu hồi của worker này)
+        await _revoke_reused_family(db, user_id, family, token_data.jti)
+        return None
+    return create_token_pair(user.id, family)
+
+
+async def _revoke_reused_family(db: DBSession, user_id: int, family: str, jti: str) -> None:
+    logger.warning(
+        "Refresh token %s của user %s bị dùng lại, thu hồi family %s", jti, user_id, family
+    )
+    await revoke_refresh_family(db, user_id, family)
+
+
+async def purge_expired_revocations() -> int:
+    """
+    Xóa các dòng revoked_tokens đã hết hạn (token tương ứng đã không còn dùng được), trả về số dòng đã xóa
+    """
+    async with session_scope() as db:
+        result = await db.execute(
+            delete(RevokedToken).where(RevokedToken.expires_at <= datetime.now(timezone.utc))
+        )
+        await db.commit()
+        return result.rowcount
+
+
+async def reload_revocation_list() -> None:
+    """
+    Dựng lại danh sách thu hồi trong bộ nhớ từ các token chưa hết hạn trong bảng revoked_tokens
+    """
+    async with session_scope() as db:
+        result = await db.scalars(
+            select(RevokedToken.jti).where(RevokedToken.expires_at > datetime.now(timezone.utc))
+        )
+        revocation_list.replace(result.all())
+
+
+async def run_revocation_refresher() -> None:
+    """
+    Vòng lặp nền dựng lại danh sách thu hồi mỗi REVOCATION_REFRESH_SECONDS giây,
+    nhờ đó get_current_user kiểm tra thu hồi mà không cần truy vấn database;
+    mỗi REVOKED_TOKEN_PURGE_SECONDS giây xóa các dòng đã hết hạn khỏi bảng
+    """
+    last_purge = time.monotonic()
+    while True:
+        try:
+            await reload_revocation_list()
+        except Exception:
+            logger.exception("Không thể tải danh sách token bị thu hồi")
+        if time.monotonic() - last_purge >= settings.REVOKED_TOKEN_PURGE_SECONDS:
+            last_purge = time.monotonic()
+            try:
+                purged = await purge_expired_revocations()
+                logger.info("Đã xóa %d token thu hồi đã hết hạn", purged)
+            except Exception:
+                logger.exception("Không thể xóa các token thu hồi đã hết hạn")
+        await asyncio.sleep(settings.REVOCATION_REFRESH_SECONDS)
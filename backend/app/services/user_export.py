@@ -0,0 +1,118 @@
+import csv
+import io
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, AsyncIterator, Dict, Optional
+
+from sqlalchemy import select
+
+from ..core.config import settings
+from ..database.replicas import read_session_scope
+from ..models.address import Address
+from ..models.user import User
+
+USER_COLUMNS = (
+    "id",
+    "username",
+    "email",
+    "full_name",
+    "phone_number",
+    "is_active",
+    "role",
+    "created_at",
+    "updated_at",
+)
+ADDRESS_COLUMNS = (
+    "address_id",
+    "address_name",
+    "address",
+    "latitude",
+    "longitude",
+    "is_default",
+)
+
+
+def _export_statement():
+    # Chọn cột thay vì entity ORM để không giữ đối tượng trong identity map
+    return select(
+        *[getattr(User, column) for column in USER_COLUMNS],
+        Address.id.label("address_id"),
+        Address.address_name,
+        Address.address,
+        Address.latitude,
+        Address.longitude,
+        Address.is_default,
+    ).outerjoin(
+        Address, Address.user_id == User.id
+    ).order_by(
+        User.id, Address.id
+    ).execution_options(yield_per=settings.EXPORT_YIELD_PER)
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Không thể chuyển {type(value).__name__} sang JSON")
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return "" if value is None else value
+
+
+async def _iter_rows() -> AsyncIterator[Any]:
+    """
+    Đọc lần lượt từng nhóm dòng qua server-side cursor.
+    Session được mở riêng và đóng ngay khi stream kết thúc hoặc client ngắt kết nối.
+    """
+    async with read_session_scope() as db:
+        result = await db.stream(_export_statement())
+        try:
+            async for partition in result.partitions():
+                yield partition
+        finally:
+            await result.close()
+
+
+async def export_users_ndjson() -> AsyncIterator[str]:
+    """
+    Xuất mỗi user thành một dòng JSON, kèm danh sách địa chỉ lồng bên trong
+    """
+    current: Optional[Dict[str, Any]] = None
+    async for partition in _iter_rows():
+        lines = []
+        for row in partition:
+            mapping = row._mapping
+            if current is None or current["id"] != mapping["id"]:
+                if current is not None:
+                    lines.append(json.dumps(current, default=_json_default, ensure_ascii=False))
+                current = {column: mapping[column] for column in USER_COLUMNS}
+                current["addresses"] = []
+            if mapping["address_id"] is not None:
+                address = {column: mapping[column] for column in ADDRESS_COLUMNS}
+                address["id"] = address.pop("address_id")
+                current["addresses"].append(address)
+        if lines:
+            yield "\n".join(lines) + "\n"
+    if current is not None:
+        yield json.dumps(current, default=_json_default, ensure_ascii=False) + "\n"
+
+
+async def export_users_csv() -> AsyncIterator[str]:
+    """
+    Xuất CSV với mỗi dòng là một cặp (user, địa chỉ); user chưa có địa chỉ có cột địa chỉ để trống
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(USER_COLUMNS + ADDRESS_COLUMNS)
+    yield buffer.getvalue()
+    async for partition in _iter_rows():
+        buffer.seek(0)
+        buffer.truncate()
+        for row in partition:
+            writer.writerow([_csv_value(value) for value in row])
+        yield buffer.getvalue()
@@ -0,0 +1,109 @@
+import json
+from typing import Any, List, Optional
+
+from sqlalchemy import case, func, or_, select
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import selectinload
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from ..database.database import DBSession
+from ..models.user import User
+
+SEARCH_COLUMNS = (User.username, User.email, User.full_name, User.phone_number)
+
+# Ngoài PostgreSQL không có EXPLAIN để ước lượng, đếm chính xác nhưng dừng ở ngưỡng này
+EXACT_COUNT_CAP = 10000
+
+
+class _ExplainJSON(Executable, ClauseElement):
+    """
+    EXPLAIN (FORMAT JSON) <statement> của PostgreSQL, giữ nguyên tham số bind của statement
+    """
+
+    inherit_cache = False
+
+    def __init__(self, statement: Any):
+        self.statement = statement
+
+
+@compiles(_ExplainJSON, "postgresql")
+def _compile_explain_json(element: _ExplainJSON, compiler: Any, **kw: Any) -> str:
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _search_filter(q: str, role: Optional[str], is_active: Optional[bool]) -> List[Any]:
+    # ILIKE '%q%' dùng được index GIN trigram (ix_users_*_trgm) khi q có từ 3 ký tự
+    pattern = f"%{_escape_like(q)}%"
+    conditions = [or_(*[column.ilike(pattern, escape="\\") for column in SEARCH_COLUMNS])]
+    if role is not None:
+        conditions.append(User.role == role)
+    if is_active is not None:
+        conditions.append(User.is_active == is_active)
+    return conditions
+
+
+def _rank(q: str) -> Any:
+    """
+    Thứ hạng kết quả: trùng khớp hoàn toàn (0), khớp tiền tố (1), chứa chuỗi tìm kiếm (2)
+    """
+    prefix = f"{_escape_like(q)}%"
+    lowered = q.lower()
+    return case(
+        (
+            or_(
+                func.lower(User.username) == lowered,
+                func.lower(User.email) == lowered,
+                User.phone_number == q,
+            ),
+            0,
+        ),
+        (or_(*[column.ilike(prefix, escape="\\") for column in SEARCH_COLUMNS]), 1),
+        else_=2,
+    )
+
+
+async def search_users(
+    db: DBSession,
+    q: str,
+    role: Optional[str] = None,
+    is_active: Optional[bool] = None,
+    limit: int = 20,
+) -> List[User]:
+    """
+    Tìm user theo một phần username, email, họ tên hoặc số điện thoại, xếp hạng theo độ khớp
+    rồi đến độ dài username; chỉ lấy tối đa limit bản ghi
+    """
+    query = (
+        select(User)
+        .options(selectinload(User.addresses))
+        .where(*_search_filter(q, role, is_active))
+        .order_by(_rank(q), func.length(User.username), User.id)
+        .limit(limit)
+    )
+    return (await db.scalars(query)).all()
+
+
+async def estimate_search_total(
+    db: DBSession,
+    q: str,
+    role: Optional[str] = None,
+    is_active: Optional[bool] = None,
+) -> int:
+    """
+    Ước lượng số user khớp tìm kiếm mà không đếm toàn bộ: trên PostgreSQL lấy số dòng dự kiến
+    từ EXPLAIN, các database khác đếm chính xác tối đa EXACT_COUNT_CAP dòng
+    """
+    matching = select(User.id).where(*_search_filter(q, role, is_active))
+    connection = await db.connection()
+    if connection.dialect.name == "postgresql":
+        plan = await db.scalar(_ExplainJSON(matching))
+        # asyncpg trả cột json dạng chuỗi, psycopg2 đã parse sẵn
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+    capped = matching.limit(EXACT_COUNT_CAP).subquery()
+    return await db.scalar(select(func.count()).select_from(capped))
@@ -1,111 +1,186 @@
 from typing import Optional, Dict, Any, List
-from sqlalchemy.orm import Session
-from datetime import datetime
+from datetime import datetime, timezone
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from ..database.database import DBSession
+from ..database.queries import USER_BY_EMAIL, USER_BY_ID
+from ..database.replicas import mark_recent_writer
 from ..models.user import User
 from ..schemas.user import UserCreate, UserUpdate
-from ..core.security import get_password_hash, verify_password
+from ..core.change_feed import publish_change
+from ..core.hashing import HashingQueueFullError, hashing_executor
+from ..core.metrics import registry
+from ..core.security import password_needs_rehash
+from .principal_cache import principal_cache
 
+PASSWORD_REHASHES = registry.counter(
+    "password_rehash_total",
+    "Số mật khẩu được hash lại khi đăng nhập do tham số hash thay đổi",
+)
 
-def get_user_by_email(db: Session, email: str) -> Optional[User]:
+
+class UserAlreadyExistsError(Exception):
+    """
+    Username hoặc email đã được dùng (vi phạm unique index khi insert)
+    """
+
+    def __init__(self, field: str):
+        super().__init__(field)
+        self.field = field
+
+
+def _conflict_field(exc: IntegrityError) -> Optional[str]:
+    # Dòng đầu của lỗi chứa tên index/cột bị trùng (cả PostgreSQL và SQLite),
+    # các dòng sau có thể chứa giá trị người dùng nhập nên bỏ qua
+    message = str(exc.orig).splitlines()[0].lower() if exc.orig is not None else ""
+    for field in ("username", "email"):
+        if field in message:
+            return field
+    return None
+
+
+async def get_user_by_email(db: DBSession, email: str) -> Optional[User]:
     """
     Lấy user theo email
     """
-    return db.query(User).filter(User.email == email).first()
+    return await db.scalar(USER_BY_EMAIL, {"email": email})
 
 
-def get_user_by_id(db: Session, user_id: int) -> Optional[User]:
+async def get_user_by_id(db: DBSession, user_id: int) -> Optional[User]:
     """
     Lấy user theo ID
     """
-    return db.query(User).filter(User.id == user_id).first()
+    return await db.scalar(USER_BY_ID, {"user_id": user_id})
 
 
-def create_user(db: Session, user_create: UserCreate) -> User:
+async def create_user(db: DBSession, user_create: UserCreate) -> User:
     """
     Tạo người dùng mới
-    
+
     Args:
         db: Database session
         user_create: Thông tin người dùng cần tạo
-        
+
     Returns:
         User đã được tạo
+
+    Raises:
+        UserAlreadyExistsError: username hoặc email (không phân biệt hoa thường) đã tồn tại
     """
     # Tạo hash password từ password thô
-    hashed_password = get_password_hash(user_create.password)
-    
-    # Tạo đối tượng User từ schema UserCreate
-    db_user = User(
-        username=user_create.username,
-        email=user_create.email,
-        full_name=user_create.full_name,
-        phone_number=user_create.phone_number,
-        hashed_password=hashed_password,
-        is_active=user_create.is_active,
-        role=user_create.role
+    hashed_password = await hashing_executor.hash(user_create.password)
+
+    # Một câu INSERT ... RETURNING lấy luôn id và các cột mặc định, không cần kiểm tra trước
+    # hay refresh sau; trùng username/email được unique index chặn kể cả khi đăng ký đồng thời
+    statement = (
+        insert(User)
+        .values(
+            username=user_create.username,
+            email=user_create.email,
+            full_name=user_create.full_name,
+            phone_number=user_create.phone_number,
+            hashed_password=hashed_password,
+            is_active=user_create.is_active,
+            role=user_create.role,
+        )
+        .returning(User)
     )
-    
-    # Thêm vào database
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    
+    try:
+        db_user = await db.scalar(statement)
+        await db.commit()
+    except IntegrityError as exc:
+        await db.rollback()
+        field = _conflict_field(exc)
+        if field is None:
+            raise
+        raise UserAlreadyExistsError(field) from exc
+
     return db_user
 
 
-def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
+async def authenticate_user(db: DBSession, email: str, password: str) -> Optional[User]:
     """
     Xác thực user
     """
-    user = get_user_by_email(db, email=email)
+    user = await get_user_by_email(db, email=email)
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    if not await hashing_executor.verify(password, user.hashed_password):
         return None
+    if password_needs_rehash(user.hashed_password):
+        await _rehash_password(db, user, password)
     return user
 
 
-def change_user_password(db: Session, user: User, new_password: str) -> User:
+async def _rehash_password(db: DBSession, user: User, password: str) -> None:
     """
-    Đổi mật khẩu cho user
+    Hash lại mật khẩu theo tham số hiện tại ngay khi biết mật khẩu thô (lúc đăng nhập thành công),
+    nhờ đó đổi số rounds cho toàn hệ thống mà không bắt người dùng đặt lại mật khẩu
     """
-    user.hashed_password = get_password_hash(new_password)
+    try:
+        user.hashed_password = await hashing_executor.hash(password)
+    except HashingQueueFullError:
+        # Đang quá tải: bỏ qua, lần đăng nhập sau sẽ hash lại
+        return
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await principal_cache.invalidate(user.id)
+    await db.refresh(user)
+    PASSWORD_REHASHES.inc()
+
+
+async def change_user_password(db: DBSession, user: User, new_password: str) -> User:
+    """
+    Đổi mật khẩu cho user; mọi refresh token đã cấp trước đó (kể cả token bị đánh cắp) hết hiệu lực
+    """
+    user.hashed_password = await hashing_executor.hash(new_password)
+    user.tokens_valid_after = datetime.now(timezone.utc)
+    db.add(user)
+    await db.commit()
+    await principal_cache.invalidate(user.id)
+    await mark_recent_writer(user.id)
+    await db.refresh(user)
     return user
 
 
-def update_user(db: Session, user_id: int, user_update: UserUpdate) -> Optional[User]:
+async def update_user(db: DBSession, user_id: int, user_update: UserUpdate) -> Optional[User]:
     """
     Cập nhật thông tin người dùng dựa trên UserUpdate schema
-    
+
     Args:
         db: Database session
         user_id: ID của người dùng cần cập nhật
         user_update: Thông tin cần cập nhật
-        
+
     Returns:
         User đã được cập nhật hoặc None nếu không tìm thấy
     """
-    user = db.query(User).filter(User.id == user_id).first()
-    
+    user = await get_user_by_id(db, user_id)
+
     if not user:
         return None
-    
+
     # Chuyển đổi từ UserUpdate thành dữ liệu cập nhật
     update_data = user_update.dict(exclude_unset=True)
-    
+
     # Cập nhật các trường thông tin
     for key, value in update_data.items():
         if hasattr(user, key) and value is not None:
             setattr(user, key, value)
-    
+
     # Cập nhật thời gian sửa đổi
     user.updated_at = datetime.utcnow()
-    
+
     # Lưu vào database
-    db.commit()
-    db.refresh(user)
-    
-    return user 
\ No newline at end of file
+    await db.commit()
+
+    # Xóa cache để get_current_user thấy thay đổi (kể cả khi bị vô hiệu hóa); các lần đọc
+    # tiếp theo của user được sửa (không phải admin gửi request) đi về primary
+    await principal_cache.invalidate(user_id)
+    await mark_recent_writer(user_id)
+    await db.refresh(user)
+
+    # Báo cho các client đang nghe change feed của user tải lại hồ sơ
+    await publish_change(user_id, "user.updated")
+
+    return user
@@ -0,0 +1,23 @@
+from typing import Any, Optional, Tuple
+
+from ..database.database import DBSession
+from ..database.queries import ADDRESSES_VERSION, PROFILE_VERSION
+
+
+async def get_profile_version(db: DBSession, user_id: int) -> Optional[Tuple[Any, ...]]:
+    """
+    Phiên bản hồ sơ user kèm địa chỉ, lấy bằng một truy vấn tổng hợp thay vì dựng toàn bộ response.
+    Trả về None nếu user không tồn tại.
+    """
+    result = await db.execute(PROFILE_VERSION, {"user_id": user_id})
+    row = result.first()
+    return tuple(row) if row is not None else None
+
+
+async def get_addresses_version(db: DBSession, user_id: int) -> Tuple[Any, ...]:
+    """
+    Phiên bản danh sách địa chỉ của user: số lượng, id lớn nhất và updated_at mới nhất
+    (thêm, xóa hay sửa địa chỉ đều làm thay đổi ít nhất một giá trị)
+    """
+    result = await db.execute(ADDRESSES_VERSION, {"user_id": user_id})
+    return tuple(result.one())
@@ -0,0 +1,128 @@
+import logging
+import time
+from contextlib import AsyncExitStack, contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List
+
+from ..core.config import settings
+from ..core.hashing import hashing_executor
+from ..core.metrics import registry
+from ..core.serialization import type_adapter
+from ..core.zones import load_zone_index
+from ..database.database import DBSession, init_engines, session_scope
+from ..database.queries import HOT_QUERIES
+from ..database.replicas import replica_set
+from ..models.address import Address
+from ..models.user import User
+from ..schemas.address import Address as AddressSchema
+from ..schemas.user import User as UserSchema, UserPage
+
+logger = logging.getLogger(__name__)
+
+STARTUP_PHASE_DURATION = registry.gauge(
+    "app_startup_phase_seconds",
+    "Thời gian từng bước khởi động của worker",
+    ["phase"],
+)
+
+# Schema được serialize nhiều nhất, dựng validator/serializer trước
+HOT_SCHEMAS = (List[UserSchema], UserSchema, List[AddressSchema], UserPage)
+
+
+@contextmanager
+def timed_phase(report: Dict[str, Any], phase: str) -> Iterator[None]:
+    """
+    Ghi thời gian một bước khởi động vào report; bước lỗi được ghi lại nhưng không chặn khởi động
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        logger.exception("Bước khởi động %s thất bại", phase)
+        report.setdefault("failed", []).append(phase)
+    finally:
+        duration = time.perf_counter() - started
+        report[f"{phase}_seconds"] = round(duration, 4)
+        STARTUP_PHASE_DURATION.labels(phase).set(duration)
+
+
+async def _open_sessions(stack: AsyncExitStack) -> List[DBSession]:
+    """
+    Mở session tới primary và từng replica đang hoạt động (mỗi nơi một session)
+    """
+    sessions = [await stack.enter_async_context(session_scope())]
+    for replica in replica_set.candidates():
+        session = replica.session_factory()
+        stack.push_async_callback(session.close)
+        sessions.append(session)
+    return sessions
+
+
+async def warm_pool(connections: int) -> int:
+    """
+    Mở sẵn tối đa DB_POOL_SIZE kết nối tới primary và từng replica; kết nối được trả về pool và giữ mở
+    """
+    connections = min(connections, settings.DB_POOL_SIZE)
+    opened = 0
+    async with AsyncExitStack() as stack:
+        for _ in range(connections):
+            for session in await _open_sessions(stack):
+                await session.connection()
+                opened += 1
+    return opened
+
+
+async def warm_queries() -> int:
+    """
+    Chạy trước các truy vấn nóng (database/queries.py) với tham số không khớp dòng nào,
+    để SQL đã biên dịch nằm sẵn trong compiled cache của từng engine
+    """
+    executed = 0
+    async with AsyncExitStack() as stack:
+        for db in await _open_sessions(stack):
+            for statement, params in HOT_QUERIES:
+                result = await db.execute(statement, params)
+                result.unique().all()
+                executed += 1
+    return executed
+
+
+def warm_serializers() -> None:
+    """
+    Dựng TypeAdapter cho các schema nóng và serialize thử một bản ghi mẫu
+    """
+    now = datetime.now(timezone.utc)
+    sample = User(
+        id=0, username="warmup", email="warmup@spotifood.vn", is_active=True, role="customer",
+        created_at=now, updated_at=now,
+    )
+    sample.addresses.append(Address(
+        id=0, user_id=0, address="warmup", latitude=0.0, longitude=0.0, is_default=False,
+        created_at=now, updated_at=now,
+    ))
+    for schema in HOT_SCHEMAS:
+        type_adapter(schema)
+    for schema, value in ((List[UserSchema], [sample]), (UserSchema, sample), (List[AddressSchema], sample.addresses)):
+        adapter = type_adapter(schema)
+        adapter.dump_json(adapter.validate_python(value, from_attributes=True))
+
+
+async def run_warmup(report: Dict[str, Any]) -> None:
+    """
+    Các bước làm nóng worker trước khi nhận request, thời gian từng bước ghi vào report
+    """
+    with timed_phase(report, "engines"):
+        init_engines()
+        report["replicas"] = len(replica_set.replicas)
+    with timed_phase(report, "zones"):
+        report["zones"] = len(load_zone_index())
+    if not settings.STARTUP_WARMUP:
+        return
+    with timed_phase(report, "pool"):
+        report["pool_connections"] = await warm_pool(settings.DB_POOL_WARMUP_CONNECTIONS)
+    with timed_phase(report, "queries"):
+        report["hot_queries"] = await warm_queries()
+    with timed_phase(report, "serializers"):
+        warm_serializers()
+    with timed_phase(report, "hashing_pool"):
+        await hashing_executor.warm()
@@ -0,0 +1,142 @@
+"""
+Gán lại vùng giao hàng cho toàn bộ địa chỉ khi file vùng thay đổi.
+
+Chạy tay từ thư mục backend:
+    python -m app.services.zone_service [--path zones.geojson]
+hoặc qua POST /api/zones/reassign (admin), job chạy nền trong worker nhận request. Các worker khác
+tự nạp lại file vùng khi file đổi (xem core.zones), chạy tay với --path khác DELIVERY_ZONES_PATH
+thì các worker không biết vùng mới.
+"""
+import argparse
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import bindparam, select, update
+
+from ..core.config import settings
+from ..core.metrics import registry
+from ..core.zones import ZoneIndex, get_zone_index, load_zone_index
+from ..database.database import session_scope
+from ..models.address import Address
+
+logger = logging.getLogger(__name__)
+
+ZONE_REASSIGNED = registry.counter(
+    "delivery_zone_reassigned_total",
+    "Số địa chỉ được đổi vùng giao hàng bởi job gán lại vùng",
+)
+
+# Chỉ ghi vùng khi tọa độ vẫn là tọa độ đã dùng để tính vùng: địa chỉ được sửa tọa độ giữa lúc đọc và
+# lúc ghi đã được update_address gán vùng theo tọa độ mới, không được ghi đè bằng vùng cũ
+ZONE_UPDATE = (
+    update(Address.__table__)
+    .where(
+        Address.id == bindparam("address_id"),
+        Address.latitude.is_not_distinct_from(bindparam("zone_latitude")),
+        Address.longitude.is_not_distinct_from(bindparam("zone_longitude")),
+    )
+    .values(zone_id=bindparam("new_zone_id"))
+)
+
+_reassign_task: Optional["asyncio.Task[Dict[str, Any]]"] = None
+_last_report: Dict[str, Any] = {"status": "idle", "zones": 0}
+
+
+async def reassign_address_zones(
+    index: Optional[ZoneIndex] = None, batch_size: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Duyệt địa chỉ theo id (keyset), mỗi lượt batch_size dòng: tính vùng cho cả lượt bằng
+    ZoneIndex.assign_many và chỉ ghi các dòng đổi vùng bằng một câu UPDATE executemany theo khóa chính
+    và tọa độ đã đọc
+    """
+    index = index or get_zone_index()
+    batch_size = batch_size or settings.ZONE_REASSIGN_BATCH_SIZE
+    started = time.perf_counter()
+    scanned = 0
+    updated = 0
+    last_id = 0
+    statement = (
+        select(Address.id, Address.latitude, Address.longitude, Address.zone_id)
+        .order_by(Address.id)
+        .limit(batch_size)
+    )
+    async with session_scope() as db:
+        while True:
+            rows = (await db.execute(statement.where(Address.id > last_id))).all()
+            if not rows:
+                break
+            zone_ids = index.assign_many([row.latitude for row in rows], [row.longitude for row in rows])
+            changes: List[Dict[str, Any]] = [
+                {
+                    "address_id": row.id,
+                    "zone_latitude": row.latitude,
+                    "zone_longitude": row.longitude,
+                    "new_zone_id": zone_id,
+                }
+                for row, zone_id in zip(rows, zone_ids)
+                if row.zone_id != zone_id
+            ]
+            if changes:
+                await db.execute(ZONE_UPDATE, changes)
+                await db.commit()
+                ZONE_REASSIGNED.inc(len(changes))
+            scanned += len(rows)
+            updated += len(changes)
+            last_id = rows[-1].id
+    return {
+        "scanned": scanned,
+        "updated": updated,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+async def _run_reassign(index: ZoneIndex) -> Dict[str, Any]:
+    global _last_report
+    try:
+        result = await reassign_address_zones(index)
+    except Exception as exc:
+        logger.exception("Job gán lại vùng giao hàng thất bại")
+        _last_report = {"status": "failed", "zones": len(index), "error": str(exc)}
+    else:
+        _last_report = {"status": "completed", "zones": len(index), **result}
+        logger.info("Đã gán lại vùng giao hàng: %s", _last_report)
+    return _last_report
+
+
+def reassign_running() -> bool:
+    return _reassign_task is not None and not _reassign_task.done()
+
+
+def start_reassign_job(path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Nạp lại file vùng rồi chạy job gán lại vùng ở nền; trả về trạng thái ban đầu của job.
+    Gọi khi job trước còn chạy là lỗi (RuntimeError).
+    """
+    global _reassign_task, _last_report
+    if reassign_running():
+        raise RuntimeError("Job gán lại vùng giao hàng đang chạy")
+    index = load_zone_index(path)
+    _last_report = {"status": "running", "zones": len(index)}
+    _reassign_task = asyncio.create_task(_run_reassign(index))
+    return _last_report
+
+
+def reassign_status() -> Dict[str, Any]:
+    return _last_report
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Gán lại vùng giao hàng cho toàn bộ địa chỉ")
+    parser.add_argument("--path", help="File GeoJSON vùng giao hàng (mặc định DELIVERY_ZONES_PATH)")
+    parser.add_argument("--batch-size", type=int, default=None)
+    args = parser.parse_args(argv)
+    index = load_zone_index(args.path)
+    result = asyncio.run(reassign_address_zones(index, args.batch_size))
+    print({"zones": len(index), **result})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+"""
+Benchmark tải cho các luồng auth, users và addresses.
+
+Dựng app bằng app.main.create_app trên một database SQLite cục bộ (thay cho PostgreSQL), seed dữ liệu
+theo số lượng cấu hình rồi chạy các kịch bản: login dồn dập, /users/me với token,
+CRUD địa chỉ và phân trang sâu GET /users/. Kết quả gồm p50/p95/p99, throughput và số
+truy vấn SQL mỗi request (từ header X-DB-Query-Count), ghi ra JSON để so sánh giữa các bản.
+
+Chạy từ thư mục backend (cần thêm httpx và aiosqlite):
+    python -m benchmarks.load --users 5000 --requests 1000 --concurrency 50 --output bench.json
+    python -m benchmarks.load --output bench_new.json --compare bench.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+BENCH_PASSWORD = "bench-password"
+SCENARIOS = ("login_storm", "users_me", "address_crud", "deep_pagination")
+
+
+def configure_environment(db_path: str, sync_db: bool, hash_pool_size: int) -> None:
+    """
+    Đặt biến môi trường trước khi import app (config đọc biến môi trường khi import)
+    """
+    defaults = {
+        "POSTGRES_SERVER": "localhost",
+        "POSTGRES_PORT": "5432",
+        "POSTGRES_USER": "bench",
+        "POSTGRES_PASSWORD": "bench",
+        "POSTGRES_DB": "bench",
+        "SECRET_KEY": "bench-secret-key",
+        # Mọi request benchmark đến từ cùng một IP: tắt giới hạn đăng nhập để đo hasher
+        "LOGIN_RATE_LIMIT_PER_IP": "0",
+        "LOGIN_RATE_LIMIT_PER_EMAIL": "0",
+    }
+    for key, value in defaults.items():
+        os.environ.setdefault(key, value)
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ["ASYNC_DATABASE_URL"] = f"sqlite+aiosqlite:///{db_path}"
+    os.environ["DB_ASYNC"] = "False" if sync_db else "True"
+    os.environ["HASH_POOL_SIZE"] = str(hash_pool_size)
+    os.environ["SQL_ACCOUNTING_HEADERS"] = "True"
+
+
+def seed_database(users: int, addresses_per_user: int, seed: int) -> None:
+    """
+    Tạo bảng và seed dữ liệu bằng insert nhiều dòng (user 1 là admin)
+    """
+    from sqlalchemy import insert
+
+    from app.core.geo import address_geohash
+    from app.core.security import get_password_hash
+    from app.database.database import Base, engine
+    from app.models.address import Address
+    from app.models.revoked_token import RevokedToken  # noqa: F401 (tạo bảng)
+    from app.models.user import User
+
+    rng = random.Random(seed)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+    hashed_password = get_password_hash(BENCH_PASSWORD)
+    created_base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    chunk = 1000
+    with engine.begin() as conn:
+        for start in range(0, users, chunk):
+            rows = [
+                {
+                    "id": index + 1,
+                    "username": f"user{index}",
+                    "email": f"user{index}@bench.spotifood.vn",
+                    "hashed_password": hashed_password,
+                    "full_name": f"Bench User {index}",
+                    "phone_number": f"09{index:08d}",
+                    "is_active": True,
+                    "role": "admin" if index == 0 else "customer",
+                    "created_at": created_base + timedelta(seconds=index),
+                    "updated_at": created_base + timedelta(seconds=index),
+                }
+                for index in range(start, min(start + chunk, users))
+            ]
+            conn.execute(insert(User), rows)
+
+        address_rows: List[Dict[str, Any]] = []
+        for user_id in range(1, users + 1):
+            for position in range(addresses_per_user):
+                latitude = round(10.7 + rng.uniform(-0.2, 0.2), 8)
+                longitude = round(106.7 + rng.uniform(-0.2, 0.2), 8)
+                address_rows.append({
+                    "user_id": user_id,
+                    "address_name": f"Địa chỉ {position}",
+                    "address": f"{rng.randint(1, 999)} Đường Bench, Quận {rng.randint(1, 12)}",
+                    "latitude": latitude,
+                    "longitude": longitude,
+                    "geohash": address_geohash(latitude, longitude),
+                    "is_default": position == 0,
+                })
+            if len(address_rows) >= chunk:
+                conn.execute(insert(Address), address_rows)
+                address_rows = []
+        if address_rows:
+            conn.execute(insert(Address), address_rows)
+
+
+class Recorder:
+    """
+    Ghi độ trễ, status và số truy vấn SQL của từng request trong một kịch bản
+    """
+
+    def __init__(self, client: Any):
+        self.client = client
+        self.latencies: List[float] = []
+        self.queries: List[int] = []
+        self.errors = 0
+
+    async def request(self, method: str, url: str, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        response = await self.client.request(method, url, **kwargs)
+        self.latencies.append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            self.errors += 1
+        query_count = response.headers.get("x-db-query-count")
+        if query_count is not None:
+            self.queries.append(int(query_count))
+        return response
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(recorder: Recorder, elapsed: float) -> Dict[str, Any]:
+    latencies = sorted(recorder.latencies)
+    return {
+        "requests": len(latencies),
+        "errors": recorder.errors,
+        "elapsed_s": round(elapsed, 4),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(_percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(_percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 3),
+        "queries_per_request": (
+            round(sum(recorder.queries) / len(recorder.queries), 3) if recorder.queries else None
+        ),
+    }
+
+
+async def run_scenario(client: Any, name: str, args: argparse.Namespace, rng: random.Random) -> Dict[str, Any]:
+    from app.core.security import create_access_token
+
+    recorder = Recorder(client)
+    api = "/api"
+    tokens = {
+        user_id: create_access_token(subject=user_id)
+        for user_id in rng.sample(range(1, args.users + 1), min(args.users, 200))
+    }
+    token_ids = list(tokens)
+    admin_headers = {"Authorization": f"Bearer {create_access_token(subject=1)}"}
+    deepest_skip = max(args.users - 100, 0)
+
+    async def login_storm(index: int) -> None:
+        user_index = rng.randrange(args.users)
+        await recorder.request(
+            "POST", f"{api}/auth/login",
+            json={"email": f"user{user_index}@bench.spotifood.vn", "password": BENCH_PASSWORD},
+        )
+
+    async def users_me(index: int) -> None:
+        user_id = token_ids[index % len(token_ids)]
+        await recorder.request(
+            "GET", f"{api}/users/me", headers={"Authorization": f"Bearer {tokens[user_id]}"}
+        )
+
+    async def address_crud(index: int) -> None:
+        user_id = token_ids[index % len(token_ids)]
+        headers = {"Authorization": f"Bearer {tokens[user_id]}"}
+        created = await recorder.request(
+            "POST", f"{api}/addresses/", headers=headers,
+            json={"address": f"{index} Đường Tải", "latitude": 10.75, "longitude": 106.66},
+        )
+        if created.status_code != 201:
+            return
+        address_id = created.json()["id"]
+        await recorder.request("GET", f"{api}/addresses/", headers=headers)
+        await recorder.request(
+            "PUT", f"{api}/addresses/{address_id}", headers=headers, json={"address_name": "Đã sửa"}
+        )
+        await recorder.request("DELETE", f"{api}/addresses/{address_id}", headers=headers)
+
+    async def deep_pagination(index: int) -> None:
+        # Luân phiên 10 trang cuối cùng của danh sách
+        skip = max(deepest_skip - (index % 10) * 100, 0)
+        await recorder.request("GET", f"{api}/users/?skip={skip}&limit=100", headers=admin_headers)
+
+    step = {
+        "login_storm": login_storm,
+        "users_me": users_me,
+        "address_crud": address_crud,
+        "deep_pagination": deep_pagination,
+    }[name]
+    total = args.requests if name != "login_storm" else args.login_requests
+    counter = iter(range(total))
+
+    async def worker() -> None:
+        for index in counter:
+            await step(index)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(args.concurrency)])
+    return summarize(recorder, time.perf_counter() - started)
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    import httpx
+
+    from app.main import create_app
+
+    rng = random.Random(args.seed)
+    results: Dict[str, Any] = {}
+    app = create_app()
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    # ASGITransport không gửi sự kiện lifespan nên chạy trực tiếp (làm nóng và dọn hashing pool)
+    async with app.router.lifespan_context(app):
+        print(f"startup {json.dumps(app.state.startup_report)}", file=sys.stderr)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name in args.scenarios:
+                results[name] = await run_scenario(client, name, args, rng)
+                print(f"{name:16s} {json.dumps(results[name])}", file=sys.stderr)
+    return results
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], max_regression: float) -> bool:
+    """
+    In chênh lệch so với baseline; trả về False nếu p95 của kịch bản nào tăng quá max_regression (%)
+    """
+    ok = True
+    print(f"{'scenario':16s} {'metric':20s} {'baseline':>10s} {'current':>10s} {'change':>8s}")
+    for name, metrics in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base:
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps", "queries_per_request"):
+            old, new = base.get(metric), metrics.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old * 100
+            print(f"{name:16s} {metric:20s} {old:10.3f} {new:10.3f} {change:+7.1f}%")
+            if metric == "p95_ms" and change > max_regression:
+                ok = False
+    return ok
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark tải cho Spotifood API")
+    parser.add_argument("--users", type=int, default=2000, help="Số user được seed")
+    parser.add_argument("--addresses-per-user", type=int, default=2)
+    parser.add_argument("--requests", type=int, default=500, help="Số request mỗi kịch bản")
+    parser.add_argument("--login-requests", type=int, default=200, help="Số request cho login_storm")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--sync-db", action="store_true", help="Chạy với Session đồng bộ (DB_ASYNC=False)")
+    parser.add_argument("--hash-pool-size", type=int, default=2)
+    parser.add_argument("--no-warmup", action="store_true", help="Tắt làm nóng lúc khởi động (STARTUP_WARMUP=False)")
+    parser.add_argument("--db-path", help="File SQLite (mặc định tạo file tạm)")
+    parser.add_argument("--output", help="Ghi kết quả JSON ra file")
+    parser.add_argument("--compare", help="File JSON kết quả trước đó để so sánh")
+    parser.add_argument("--max-regression", type=float, default=20.0, help="Ngưỡng tăng p95 (%%) coi là suy giảm")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    db_path = args.db_path or os.path.join(tempfile.mkdtemp(prefix="spotifood-bench-"), "bench.db")
+    configure_environment(db_path, args.sync_db, args.hash_pool_size)
+    if args.no_warmup:
+        os.environ["STARTUP_WARMUP"] = "False"
+
+    seed_started = time.perf_counter()
+    seed_database(args.users, args.addresses_per_user, args.seed)
+    print(f"seeded {args.users} users in {time.perf_counter() - seed_started:.2f}s", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        },
+        "scenarios": asyncio.run(run(args)),
+    }
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            baseline = json.load(file)
+        if not compare(report, baseline, args.max_regression):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""
+Micro-benchmark chi phí Python mỗi lần gọi của các truy vấn nóng.
+
+So sánh dựng select() mới mỗi lần gọi (cách cũ) với statement dựng sẵn trong
+app.database.queries (bindparam), chạy trên SQLite trong bộ nhớ với một vài dòng dữ liệu
+để thời gian chủ yếu là phần dựng statement, tính cache key, tra compiled cache và nạp ORM.
+
+Chạy từ thư mục backend:
+    python -m benchmarks.queries --repeat 2000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import timeit
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .load import configure_environment
+
+
+def build_cases(session: Any) -> Dict[str, Tuple[Callable[[], Any], Callable[[], Any]]]:
+    from sqlalchemy import func, select
+    from sqlalchemy.orm import joinedload
+
+    from app.database import queries
+    from app.models.address import Address
+    from app.models.user import User
+
+    def user_by_id_inline() -> Any:
+        return session.scalar(select(User).where(User.id == 1).limit(1))
+
+    def user_by_id_cached() -> Any:
+        return session.scalar(queries.USER_BY_ID, {"user_id": 1})
+
+    def user_by_email_inline() -> Any:
+        stmt = select(User).where(func.lower(User.email) == func.lower("user0@bench.spotifood.vn")).limit(1)
+        return session.scalar(stmt)
+
+    def user_by_email_cached() -> Any:
+        return session.scalar(queries.USER_BY_EMAIL, {"email": "user0@bench.spotifood.vn"})
+
+    def profile_inline() -> Any:
+        stmt = select(User).options(joinedload(User.addresses)).where(User.id == 1)
+        return session.execute(stmt).unique().scalars().first()
+
+    def profile_cached() -> Any:
+        return session.execute(queries.USER_WITH_ADDRESSES, {"user_id": 1}).unique().scalars().first()
+
+    def addresses_inline() -> Any:
+        return session.scalars(select(Address).where(Address.user_id == 1)).all()
+
+    def addresses_cached() -> Any:
+        return session.scalars(queries.ADDRESSES_BY_USER, {"user_id": 1}).all()
+
+    def address_version_inline() -> Any:
+        stmt = select(
+            func.count(Address.id), func.max(Address.id), func.max(Address.updated_at)
+        ).where(Address.user_id == 1)
+        return session.execute(stmt).one()
+
+    def address_version_cached() -> Any:
+        return session.execute(queries.ADDRESSES_VERSION, {"user_id": 1}).one()
+
+    return {
+        "user_by_id": (user_by_id_inline, user_by_id_cached),
+        "user_by_email": (user_by_email_inline, user_by_email_cached),
+        "user_with_addresses": (profile_inline, profile_cached),
+        "addresses_by_user": (addresses_inline, addresses_cached),
+        "addresses_version": (address_version_inline, address_version_cached),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark chi phí dựng truy vấn mỗi lần gọi")
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    configure_environment(os.path.join(tempfile.mkdtemp(), "bench.db"), True, 0)
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+
+    from app.database.database import Base
+    from app.models.address import Address
+    from app.models.revoked_token import RevokedToken  # noqa: F401 (tạo bảng)
+    from app.models.user import User
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = Session(engine)
+    user = User(username="user0", email="user0@bench.spotifood.vn", role="customer", is_active=True)
+    user.addresses.extend(
+        Address(address=f"{i} Đường Bench", latitude=10.77, longitude=106.7) for i in range(3)
+    )
+    session.add(user)
+    session.commit()
+
+    results: Dict[str, Any] = {}
+    for name, (inline, cached) in build_cases(session).items():
+        timings = {}
+        for label, func in (("inline_us", inline), ("cached_us", cached)):
+            func()
+            seconds = min(timeit.repeat(func, number=args.repeat, repeat=3)) / args.repeat
+            timings[label] = round(seconds * 1e6, 2)
+        timings["saved_us"] = round(timings["inline_us"] - timings["cached_us"], 2)
+        timings["speedup"] = round(timings["inline_us"] / timings["cached_us"], 2)
+        results[name] = timings
+
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
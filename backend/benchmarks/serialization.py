@@ -0,0 +1,98 @@
+"""
+Micro-benchmark chi phí serialize mỗi dòng của GET /users/ (User kèm danh sách Address).
+
+So sánh đường cũ (validate response_model -> jsonable_encoder -> json.dumps, tọa độ Decimal)
+với FAST_SERIALIZATION (validate một lần từ ORM -> dump_json của pydantic-core, tọa độ float).
+
+Chạy từ thư mục backend:
+    python -m benchmarks.serialization --rows 100 --addresses-per-user 3
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import timeit
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, List, Optional
+
+from .load import configure_environment
+
+
+def build_users(rows: int, addresses_per_user: int, decimal_coordinates: bool) -> List[Any]:
+    from app.models.address import Address
+    from app.models.user import User
+
+    now = datetime.now(timezone.utc)
+    users = []
+    for index in range(rows):
+        user = User(
+            id=index + 1,
+            username=f"user{index}",
+            email=f"user{index}@bench.spotifood.vn",
+            full_name=f"Bench User {index}",
+            phone_number=f"09{index:08d}",
+            is_active=True,
+            role="customer",
+            created_at=now,
+            updated_at=now,
+        )
+        for position in range(addresses_per_user):
+            latitude, longitude = 10.77 + position / 1000, 106.7 + position / 1000
+            if decimal_coordinates:
+                latitude, longitude = Decimal(f"{latitude:.8f}"), Decimal(f"{longitude:.8f}")
+            user.addresses.append(Address(
+                id=index * addresses_per_user + position + 1,
+                user_id=index + 1,
+                address_name=f"Địa chỉ {position}",
+                address=f"{position} Đường Bench",
+                latitude=latitude,
+                longitude=longitude,
+                is_default=position == 0,
+                created_at=now,
+                updated_at=now,
+            ))
+        users.append(user)
+    return users
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark serialize danh sách user")
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--addresses-per-user", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    configure_environment(os.path.join(tempfile.mkdtemp(), "bench.db"), False, 0)
+    from fastapi.encoders import jsonable_encoder
+
+    from app.core.serialization import type_adapter
+    from app.schemas.user import User as UserSchema
+
+    adapter = type_adapter(List[UserSchema])
+    decimal_users = build_users(args.rows, args.addresses_per_user, decimal_coordinates=True)
+    float_users = build_users(args.rows, args.addresses_per_user, decimal_coordinates=False)
+
+    def legacy() -> bytes:
+        value = adapter.validate_python(decimal_users, from_attributes=True)
+        return json.dumps(
+            jsonable_encoder(value), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode("utf-8")
+
+    def fast() -> bytes:
+        return adapter.dump_json(adapter.validate_python(float_users, from_attributes=True))
+
+    results = {}
+    for name, func in (("legacy", legacy), ("fast", fast)):
+        func()
+        seconds = min(timeit.repeat(func, number=args.repeat, repeat=3)) / args.repeat
+        results[name] = {"per_page_us": round(seconds * 1e6, 2), "per_row_us": round(seconds * 1e6 / args.rows, 3)}
+
+    results["speedup"] = round(results["legacy"]["per_row_us"] / results["fast"]["per_row_us"], 2)
+    print(json.dumps({"rows": args.rows, "addresses_per_user": args.addresses_per_user, **results}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
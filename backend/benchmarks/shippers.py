@@ -0,0 +1,67 @@
+"""
+Micro-benchmark lưới vị trí shipper trong bộ nhớ: chi phí cập nhật vị trí và tìm k shipper gần nhất.
+
+Shipper được rải ngẫu nhiên trong một vùng cỡ TP.HCM (~55 km x 55 km); mục tiêu của
+GET /shippers/nearest là dưới 1 ms ở vài chục nghìn shipper đang hoạt động.
+
+Chạy từ thư mục backend:
+    python -m benchmarks.shippers --shippers 50000 --k 5
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import timeit
+from typing import List, Optional
+
+from .load import configure_environment
+
+LAT_RANGE = (10.55, 11.05)
+LNG_RANGE = (106.45, 106.95)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark tìm shipper gần nhất")
+    parser.add_argument("--shippers", type=int, default=50000)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    configure_environment(os.path.join(tempfile.mkdtemp(), "bench.db"), True, 0)
+    from app.core.config import settings
+    from app.core.shipper_locator import ShipperLocator
+
+    rng = random.Random(42)
+    locator = ShipperLocator(settings.SHIPPER_GRID_DEGREES, settings.SHIPPER_LOCATION_TTL_SECONDS)
+    for shipper_id in range(args.shippers):
+        locator.update(shipper_id, rng.uniform(*LAT_RANGE), rng.uniform(*LNG_RANGE))
+
+    points = [(rng.uniform(*LAT_RANGE), rng.uniform(*LNG_RANGE)) for _ in range(args.queries)]
+    moves = [
+        (rng.randrange(args.shippers), rng.uniform(*LAT_RANGE), rng.uniform(*LNG_RANGE))
+        for _ in range(args.queries)
+    ]
+
+    def run_queries() -> None:
+        for latitude, longitude in points:
+            locator.nearest(latitude, longitude, args.k, settings.SHIPPER_SEARCH_MAX_RADIUS_M)
+
+    def run_updates() -> None:
+        for shipper_id, latitude, longitude in moves:
+            locator.update(shipper_id, latitude, longitude)
+
+    nearest_seconds = min(timeit.repeat(run_queries, number=1, repeat=3)) / args.queries
+    update_seconds = min(timeit.repeat(run_updates, number=1, repeat=3)) / args.queries
+    print(json.dumps({
+        "shippers": args.shippers,
+        "k": args.k,
+        "nearest_us": round(nearest_seconds * 1e6, 2),
+        "update_us": round(update_seconds * 1e6, 2),
+    }, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())